@@ -0,0 +1,36 @@
+import numpy as np
+from scipy import interpolate
+
+class ArclengthTable:
+
+    def __init__(self, basecurve, t: np.ndarray ):
+        self.basecurve = basecurve
+
+        # curve parameter at the table nodes
+        self.t = np.asarray( t, dtype=float )
+
+        # cumulative arclength at the table nodes
+        self.s = np.zeros( len(self.t) )
+        self.s[1:] = np.cumsum( basecurve.segment_lengths( self.t[:-1], self.t[1:] ) )
+
+        self.length = self.s[-1]
+
+        # monotone interpolation of t(s) as initial guess for the inverse
+        self._inverse = interpolate.PchipInterpolator( self.s, self.t )
+
+    # arclength measured from the first node
+    def arclength(self, t: np.ndarray ):
+        t = np.asarray( t, dtype=float )
+        k = np.clip( np.searchsorted( self.t, t, side='right' ) - 1, 0, len(self.t) - 2 )
+        return self.s[k] + self.basecurve.segment_lengths( self.t[k], t )
+
+    # curve parameter for a given arclength
+    def parameter(self, s: np.ndarray ):
+        s = np.asarray( s, dtype=float )
+        t = self._inverse( s )
+
+        # one Newton step on s(t) - s = 0
+        v = np.linalg.norm( self.basecurve.v_many( t.reshape(-1) ), axis=1 ).reshape( t.shape )
+        t = t - ( self.arclength( t ) - s ) / v
+
+        return np.clip( t, self.t[0], self.t[-1] )
@@ -1,6 +1,38 @@
 import os
 import re
 
+import numpy as np
+
+from frenet.PointTable import PointTable
+from frenet.Topology import Topology, EntityTable
+
+# patterns used for every line, compiled once
+_tabs = re.compile('\t')
+_spaces = re.compile(' +')
+_comment = re.compile('//.*')
+_statement = re.compile(r'\s*(Point|Line Loop|Line|BSpline|Spline|Circle|Curve Loop|Plane Surface|Surface Loop|Surface|Volume)\s*\(\s*(\d+)\s*\)\s*=\s*\{(.*)\}\s*$', re.DOTALL)
+
+# entity kind of each .geo keyword, and the kind its children belong to
+_kinds = { 'Line': 'curves', 'Spline': 'curves', 'BSpline': 'curves', 'Circle': 'curves',
+           'Curve Loop': 'curveloops', 'Line Loop': 'curveloops',
+           'Surface': 'surfaces', 'Plane Surface': 'surfaces',
+           'Surface Loop': 'surfaceloops', 'Volume': 'volumes' }
+_children = { 'curves': 'points', 'curveloops': 'curves', 'surfaces': 'curveloops',
+              'surfaceloops': 'surfaces', 'volumes': 'surfaceloops' }
+
+# child ids of an entity, a:b is the range from a to b in either direction
+def _parse_ids( body: str ):
+    if ':' not in body :
+        return list( map( int, body.split(',') ) )
+    ids = []
+    for item in body.split(','):
+        if ':' in item :
+            a, b = map( int, item.split(':') )
+            ids += list( range( a, b + 1 ) if a <= b else range( a, b - 1, -1 ) )
+        else:
+            ids.append( int( item ) )
+    return ids
+
 class AsciiFile:
 # --------------------------------------------------------------------------
 
@@ -62,7 +94,85 @@ class AsciiFile:
         # loop over all lines in buffer
         for k in range(n):
             # copy line
-            Line = re.sub('\t', ' ', self.Buffer[k])
+            Line = _tabs.sub(' ', self.Buffer[k])
 
             # Tidy up line
-            self.Buffer[k] = re.sub(' +', ' ', Line.strip())
+            self.Buffer[k] = _spaces.sub(' ', Line.strip())
+
+# --------------------------------------------------------------------------
+
+    # reads the points and entities of a .geo file into a Topology in one pass over the file,
+    # without filling the buffer. Ids are kept as in the file, statements of other kinds are skipped
+    def read_geo(self, Path = '' ):
+
+        if( Path == '' ):
+            Path = self.Path
+
+        if not os.path.exists(Path):
+            raise Exception('File ' + str(Path) + ' does not exist')
+
+        points = { 'ids': [], 'values': [] }
+        entities = { k: { 'ids': [], 'labels': [], 'sizes': [], 'children': [] } for k in _children }
+
+        File = open(Path, 'r', encoding='utf-8')
+
+        # statements may span several lines and end with a semicolon
+        statement = ''
+        for Line in File:
+            statement += _comment.sub('', Line)
+            if ';' not in statement :
+                continue
+            parts = statement.split(';')
+            statement = parts.pop()
+
+            for part in parts :
+                match = _statement.match( part )
+                if match is None :
+                    continue
+                label, i, body = match.groups()
+                try:
+                    if label == 'Point' :
+                        values = [ float(v) for v in body.split(',') ]
+                        if len(values) == 3 :
+                            values.append( 0.0 )
+                        points['ids'].append( int(i) )
+                        points['values'].append( values )
+                    else:
+                        e = entities[_kinds[label]]
+                        ids = _parse_ids( body )
+                        e['ids'].append( int(i) )
+                        e['labels'].append( 'Curve Loop' if label == 'Line Loop' else label )
+                        e['sizes'].append( len(ids) )
+                        e['children'] += ids
+                except ValueError:
+                    # expressions and variables are not evaluated
+                    raise Exception('File ' + str(Path) + ': cannot read ' + part.strip())
+
+        File.close()
+
+        values = np.array( points['values'], dtype=float ).reshape(-1,4)
+        table = PointTable.from_arrays( np.ascontiguousarray( values[:,:3] ), np.ascontiguousarray( values[:,3] ) )
+        table.ids = np.array( points['ids'], dtype=int )
+
+        T = Topology( table )
+        ids = { 'points': table.ids }
+        for kind in Topology.kinds :
+            e = entities[kind]
+            raw = np.array( e['children'], dtype=int )
+
+            # rows of the children, looked up by their ids
+            child_ids = ids[_children[kind]]
+            order = np.argsort( child_ids, kind='stable' )
+            pos = np.searchsorted( child_ids[order], np.abs( raw ) )
+            pos = np.minimum( pos, max( len(order) - 1, 0 ) )
+            if len(raw) > 0 and ( len(order) == 0 or np.any( child_ids[order][pos] != np.abs( raw ) ) ):
+                raise Exception('File ' + str(Path) + ' refers to undefined ' + _children[kind])
+
+            offsets = np.zeros( len(e['sizes']) + 1, dtype=int )
+            offsets[1:] = np.cumsum( e['sizes'] )
+            table = EntityTable.from_arrays( e['labels'], offsets, order[pos] if len(raw) > 0 else raw, np.where( raw < 0, -1, 1 ) )
+            table.ids = np.array( e['ids'], dtype=int )
+            setattr( T, kind, table )
+            ids[kind] = table.ids
+
+        return T
@@ -3,6 +3,38 @@ from scipy import interpolate
 from scipy.special import roots_jacobi
 from scipy.special import eval_legendre
 
+from frenet.ArclengthTable import ArclengthTable
+from frenet.FrameTable import FrameTable
+from frenet.TwistObjective import TwistObjective
+
+# 15-point Kronrod nodes and weights on [-1,1] (QUADPACK qk15)
+_xk = np.array([0.991455371120812639206854697526329,
+                0.949107912342758524526189684047851,
+                0.864864423359769072789712788640926,
+                0.741531185599394439863864773280788,
+                0.586087235467691130294144845693013,
+                0.405845151377397166906606412076961,
+                0.207784955007898467600689403773245])
+_xk = np.concatenate( ( -_xk, [0.0], _xk[::-1] ) )
+
+_wk = np.array([0.022935322010529224963732008058970,
+                0.063092092629978553290700663189204,
+                0.104790010322250183839876322541518,
+                0.140653259715525918745189590510238,
+                0.169004726639267902826583426598550,
+                0.190350578064785409913256402421014,
+                0.204432940075298892414161999234649])
+_wk = np.concatenate( ( _wk, [0.209482141084727828012999174891714], _wk[::-1] ) )
+
+# embedded 7-point Gauss weights, the Gauss nodes are the odd Kronrod nodes
+_wg = np.array([0.129484966168869693270611432679082,
+                0.279705391489276667901467771423780,
+                0.381830050505118944950369775488975,
+                0.417959183673469387755102040816327,
+                0.381830050505118944950369775488975,
+                0.279705391489276667901467771423780,
+                0.129484966168869693270611432679082])
+
 class Basecurve :
 
     def __init__(self):
@@ -12,7 +44,15 @@ class Basecurve :
         self.theta = None
         self._thetaspline = None
         self.num_points_per_turn = 48
+
+        # orientation of the strip: 'frenet' twists the Frenet frame by theta,
+        # 'rmf' follows the rotation-minimizing frame
+        self.frame_mode = 'frenet'
+
+        # absolute error tolerance for segment lengths, None uses the fixed Gauss rule
+        self.length_tol = None
         self._isCCT = False
+        self._invalidate()
 
     # the actual basecurve function
     def r( self, t: float ):
@@ -30,65 +70,170 @@ class Basecurve :
     def b( self, t: float ):
         raise NotImplementedError()
 
-    def segment_length(self, ta: float, tb: float ):
+    # parameter values where the curve is not smooth, including both ends
+    def breakpoints(self):
+        return np.array( [ self.t[0], self.t[-1] ] )
 
-        l = 0
-        for k in range( self._nintpoints ) :
-            t = 0.5*((1-self._intpoints[k])*ta + ( 1 + self._intpoints[k])*tb)
-            v = self.v(t)
-            l += self._weights[k] * np.linalg.norm(v)
+    # array versions of r, v, a and b, returning one row per entry in t
+    def r_many( self, t: np.ndarray ):
+        t = np.asarray( t, dtype=float ).reshape(-1)
+        return np.array( [ self.r(tk) for tk in t ] ).reshape(-1,3)
 
-        l *= (tb-ta)*0.5
+    def v_many( self, t: np.ndarray ):
+        t = np.asarray( t, dtype=float ).reshape(-1)
+        return np.array( [ self.v(tk) for tk in t ] ).reshape(-1,3)
 
-        return l
+    def a_many( self, t: np.ndarray ):
+        t = np.asarray( t, dtype=float ).reshape(-1)
+        return np.array( [ self.a(tk) for tk in t ] ).reshape(-1,3)
+
+    def b_many( self, t: np.ndarray ):
+        t = np.asarray( t, dtype=float ).reshape(-1)
+        return np.array( [ self.b(tk) for tk in t ] ).reshape(-1,3)
+
+    # position, velocity, acceleration and jerk together
+    def jet( self, t: np.ndarray ):
+        return self.r_many(t), self.v_many(t), self.a_many(t), self.b_many(t)
+
+    def segment_length(self, ta: float, tb: float, tol: float = None, full_output: bool = False ):
+        l, err = self.segment_lengths( np.array([ta]), np.array([tb]), tol, True )
+        if full_output :
+            return l[0], err[0]
+        return l[0]
+
+    # lengths of all segments from ta[k] to tb[k]
+    # with tol (or self.length_tol) set, an adaptive Gauss-Kronrod rule is used
+    # and full_output also returns the error estimate for each segment
+    def segment_lengths(self, ta: np.ndarray, tb: np.ndarray, tol: float = None, full_output: bool = False ):
+
+        ta, tb = np.broadcast_arrays( np.asarray(ta, dtype=float), np.asarray(tb, dtype=float) )
+        shape = ta.shape
+
+        if tol is None :
+            tol = self.length_tol
+
+        if tol is None :
+            tq, wq = self._segment_quadrature( ta.reshape(-1), tb.reshape(-1) )
+            v = self.v_many( tq.reshape(-1) )
+            l = np.sum( wq * np.linalg.norm( v, axis=1 ).reshape( tq.shape ), axis=1 )
+            err = np.full( len(l), np.nan )
+        else:
+            l, err = self._segment_lengths_adaptive( ta.reshape(-1), tb.reshape(-1), tol )
+
+        if full_output :
+            return l.reshape( shape ), err.reshape( shape )
+        return l.reshape( shape )
+
+    # adaptive Gauss-Kronrod (7/15) quadrature of |v|, all open intervals are evaluated in one batch.
+    # the segments are split at the breakpoints of the curve first, so no interval straddles a join
+    def _segment_lengths_adaptive(self, ta: np.ndarray, tb: np.ndarray, tol: float, max_levels: int = 30 ):
+
+        n = len(ta)
+        l = np.zeros(n)
+        err = np.zeros(n)
+
+        # the tolerance of a segment is shared by its subintervals by width
+        width = np.abs( tb - ta )
+        width[ width == 0 ] = 1.0
+
+        # each interval knows the segment it belongs to
+        a, b, owner = self._split_at_breakpoints( ta, tb )
+
+        for level in range( max_levels ):
+            c = 0.5*(a + b)
+            h = 0.5*(b - a)
+
+            tq = c[:, None] + h[:, None] * _xk
+            f = np.linalg.norm( self.v_many( tq.reshape(-1) ), axis=1 ).reshape( tq.shape )
+
+            K = h * np.dot( f, _wk )
+            G = h * np.dot( f[:, 1::2], _wg )
+            e = np.abs( K - G )
+
+            done = e <= tol * np.abs( b - a ) / width[owner]
+
+            # stop where the estimate is not finite or the interval is too short to be bisected further
+            done |= ~np.isfinite( e ) | ( np.abs( h ) <= 64.0 * np.finfo(float).eps * np.maximum( np.abs( c ), 1.0 ) )
+            if level == max_levels - 1 :
+                done[:] = True
+
+            np.add.at( l, owner[done], K[done] )
+            np.add.at( err, owner[done], e[done] )
+
+            # bisect the remaining intervals
+            keep = ~done
+            if not np.any( keep ):
+                break
+
+            a = np.concatenate( ( a[keep], c[keep] ) )
+            b = np.concatenate( ( c[keep], b[keep] ) )
+            owner = np.concatenate( ( owner[keep], owner[keep] ) )
+
+        return l, err
+
+    # intervals from ta[k] to tb[k] cut at all breakpoints strictly between them, with the index k of each
+    def _split_at_breakpoints(self, ta: np.ndarray, tb: np.ndarray ):
+        n = len(ta)
+        p = self.breakpoints()
+
+        # relative position of the breakpoints inside each segment
+        with np.errstate( divide='ignore', invalid='ignore' ):
+            x = ( p[None, :] - ta[:, None] ) / ( tb - ta )[:, None]
+        inside = ( x > 0 ) & ( x < 1 )
+        if not np.any( inside ):
+            return ta.copy(), tb.copy(), np.arange(n)
+
+        k, j = np.nonzero( inside )
+        owner = np.concatenate( ( np.arange(n), k, np.arange(n) ) )
+        pos = np.concatenate( ( np.zeros(n), x[k, j], np.ones(n) ) )
+        t = np.concatenate( ( ta, p[j], tb ) )
+
+        order = np.lexsort( ( pos, owner ) )
+        owner = owner[order]
+        t = t[order]
+
+        # consecutive cuts of the same segment form an interval
+        same = owner[1:] == owner[:-1]
+        return t[:-1][same], t[1:][same], owner[:-1][same]
+
+    # drop all cached data derived from the curve geometry
+    def _invalidate(self):
+        self._arclength = None
+        self._arclength_key = None
+        self._objectives = {}
+        self._rmf = None
+        self._frames = {}
+
+    # objective engine for the grid t, built once and reused while t and free do not change
+    def twist_objective(self, t: np.ndarray, basis: str = 'local', free: np.ndarray = None ):
+        engine = self._objectives.get( basis )
+        if free is None :
+            free = np.ones( len(t), dtype=bool )
+        if engine is None or not np.array_equal( engine.t, t ) or not np.array_equal( engine.free, free ):
+            engine = TwistObjective( self, t, basis, free )
+            self._objectives[basis] = engine
+        return engine
+
+    # arclength index over n nodes between ta and tb, kept for reuse
+    def arclength_table(self, ta: float, tb: float, n: int ):
+
+        key = ( ta, tb, n )
+        if self._arclength is None or self._arclength_key != key :
+            self._arclength = ArclengthTable( self, np.linspace( ta, tb, n ) )
+            self._arclength_key = key
+
+        return self._arclength
 
     def make_equidistant(self, ta: float, tb: float, n: int ):
 
-        t = np.linspace( ta, tb, n )
-
-        # compute the full length of the Basecurve
-        l = 0
-        for k in range(1,n):
-            l += self.segment_length(t[k-1],t[k])
-
-        s = np.linspace(0,l,n)
-
-        # expected distance
-        dl = l / (n-1)
+        table = self.arclength_table( ta, tb, n )
 
-        for k in range(1,n):
-            # initial guesses
-            dt = abs(t[k] - t[k-1])
-            t0 = t[k-1]
-            t1 = t0 + 0.01*dt
+        s = np.linspace( 0, table.length, n )
+        t = table.parameter( s )
 
-
-            f1 = (self.segment_length(t0, t1) - dl) / dl
-            f2 = f1
-            t2 = t1
-            while f1*f2 > 0 :
-                t2 = t2 + dt
-                f2 = (self.segment_length(t0, t2)-dl)/dl
-            f3 = 1
-
-            c = 0
-            while abs(f3) > 1e-12:
-                # intersection point
-                if c < 20 :
-                    t3 = t1 - f1*(t2-t1)/(f2-f1)
-                else:
-                    t3 = 0.5*(t1+t2)
-                f3 = (self.segment_length(t0, t3)-dl)/dl
-
-                if f1*f3 < 0 :
-                    t2 = t3
-                    f2 = f3
-                else:
-                    t1 = t3
-                    f2 = f3
-                c = c + 1
-
-            t[k] = t3
+        # keep the end nodes exact
+        t[0] = ta
+        t[-1] = tb
 
         return t, s
 
@@ -123,6 +268,151 @@ class Basecurve :
 
         return R
 
+    # unit Frenet vectors N, B and T for all entries in t, one row each
+    def _frenet_many(self, t: np.ndarray ):
+        v = self.v_many(t)
+        a = self.a_many(t)
+
+        T = v / np.linalg.norm(v, axis=1)[:, None]
+
+        vxa = np.cross(v, a)
+        B = vxa / np.linalg.norm(vxa, axis=1)[:, None]
+        N = np.cross(B, T)
+        N /= np.linalg.norm(N, axis=1)[:, None]
+
+        return N, B, T
+
+    # stack of transformation matrices, same as transform, but for a whole t array
+    def transform_many(self, t: np.ndarray, theta_T: np.ndarray = 0.0 ):
+
+        t = np.asarray(t, dtype=float).reshape(-1)
+        N, B, T = self._frenet_many(t)
+
+        cos_theta = np.broadcast_to(np.cos(theta_T), t.shape)[:, None]
+        sin_theta = np.broadcast_to(np.sin(theta_T), t.shape)[:, None]
+
+        R = np.empty([len(t), 3, 3])
+        R[:, :, 0] = cos_theta * N + sin_theta * B
+        R[:, :, 1] = cos_theta * B - sin_theta * N
+        R[:, :, 2] = T
+
+        return R
+
+    # nodes between ta and tb such that each segment deviates from its chord by about chord_tol
+    # and the strip frame turns by about angle_tol, using curvature, torsion and the twist rate.
+    # theta is an optional twist at the current nodes self.t, pilot the number of sample points
+    def adaptive_t(self, ta: float, tb: float, chord_tol: float, angle_tol: float, theta: np.ndarray = None, pilot: int = 0 ):
+
+        if pilot == 0 :
+            pilot = 8 * max( len(self.t), 64 ) if self.t is not None else 1024
+
+        tp = np.linspace( ta, tb, pilot )
+        speed = np.linalg.norm( self.v_many( tp ), axis=1 )
+        tau, kappa_g, kappa = self.strip_curvatures_many( tp )
+
+        # twist rate with respect to arclength
+        if theta is not None :
+            spline = interpolate.make_interp_spline( self.t, theta, k=3 )
+            tau = tau + spline.derivative()( tp ) / speed
+
+        # the frame turns with the length of the Darboux vector, a chord of length h deviates by kappa*h^2/8
+        omega = np.sqrt( kappa*kappa + tau*tau )
+        density = np.maximum( np.sqrt( kappa / ( 8.0 * chord_tol ) ), omega / angle_tol ) * speed
+
+        # nodes at equal increments of the cumulative node count
+        count = np.zeros( pilot )
+        count[1:] = np.cumsum( 0.5 * ( density[1:] + density[:-1] ) * np.diff( tp ) )
+        n = max( int( np.ceil( count[-1] ) ) + 1, 2 )
+
+        t = np.interp( np.linspace( 0, count[-1], n ), count, tp )
+        t[0] = ta
+        t[-1] = tb
+
+        return t
+
+    # replaces the nodes self.t by curvature-adaptive ones (see adaptive_t) over the same range,
+    # in the 'frenet' mode the twist enters the node density and is interpolated to the new nodes
+    def resample(self, chord_tol: float, angle_tol: float ):
+
+        t = self.t
+        theta = self.frame_theta()
+        self.t = self.adaptive_t( t[0], t[-1], chord_tol, angle_tol, theta )
+        self.numpoints = len( self.t )
+
+        if self.frame_mode == 'frenet' and self.theta is not None :
+            self.theta = interpolate.make_interp_spline( t, self.theta, k=3 )( self.t )
+        else:
+            self.theta = None
+
+        self._invalidate()
+
+        return self.t
+
+    # twist of the strip in the given frame mode at the nodes self.t
+    def frame_theta(self, mode: str = None ):
+        if mode is None :
+            mode = self.frame_mode
+
+        if mode == 'frenet' :
+            if self.theta is None :
+                return np.zeros( len(self.t) )
+            return self.theta
+        elif mode == 'rmf' :
+            if self._rmf is None or not np.array_equal( self._rmf[0], self.t ):
+                self._rmf = ( np.array( self.t ), self.rotation_minimizing_theta( self.t ) )
+            return self._rmf[1]
+        else:
+            raise Exception('unknown frame mode ' + str(mode))
+
+    # centers and frames at the nodes self.t in the given frame mode, rebuilt when t or the twist change
+    def frame_table(self, mode: str = None ):
+        if mode is None :
+            mode = self.frame_mode
+
+        theta = self.frame_theta( mode )
+        table = self._frames.get( mode )
+        if table is None or not table.matches( self.t, theta ):
+            table = FrameTable( self, theta )
+            self._frames[mode] = table
+        return table
+
+    # twist that turns the Frenet frame into a rotation-minimizing frame along the nodes t,
+    # using the double reflection method (Wang et al. 2008). Each step is a rotation mapping T[k] to T[k+1],
+    # so it adds a fixed angle to the twist and all steps are evaluated at once.
+    # with match_terminals, a twist linear in arclength is removed so that the frame at the last node
+    # agrees with the Frenet frame up to full turns
+    def rotation_minimizing_theta(self, t: np.ndarray, match_terminals: bool = True ):
+
+        t = np.asarray( t, dtype=float )
+        x = self.r_many( t )
+        N, B, T = self._frenet_many( t )
+
+        # first reflection in the bisecting plane of x[k] and x[k+1]
+        v1 = x[1:] - x[:-1]
+        c1 = np.einsum('ij,ij->i', v1, v1)[:, None]
+        NL = N[:-1] - ( 2.0 / c1 ) * np.einsum('ij,ij->i', v1, N[:-1])[:, None] * v1
+        TL = T[:-1] - ( 2.0 / c1 ) * np.einsum('ij,ij->i', v1, T[:-1])[:, None] * v1
+
+        # second reflection mapping the reflected tangent onto T[k+1]
+        v2 = T[1:] - TL
+        c2 = np.einsum('ij,ij->i', v2, v2)[:, None]
+        c2[ c2 == 0 ] = 1.0
+        N1 = NL - ( 2.0 / c2 ) * np.einsum('ij,ij->i', v2, NL)[:, None] * v2
+
+        # angle of the transported normal in the Frenet frame at k+1
+        phi = np.arctan2( np.einsum('ij,ij->i', N1, B[1:]), np.einsum('ij,ij->i', N1, N[1:]) )
+
+        theta = np.zeros( len(t) )
+        theta[1:] = np.cumsum( phi )
+
+        if match_terminals :
+            s = np.zeros( len(t) )
+            s[1:] = np.cumsum( self.segment_lengths( t[:-1], t[1:] ) )
+            excess = theta[-1] - 2*np.pi * np.round( theta[-1] / (2*np.pi) )
+            theta -= excess * s / s[-1]
+
+        return theta
+
     def kappa_tau(self, t: float ):
         v = self.v(t)
         a = self.a(t)
@@ -159,66 +449,37 @@ class Basecurve :
 
         return tau, kappa_g, kappa_n
 
-    # value to minimize using SLSQP (not needed for CCT)
-    def _integrate_geodesic_curvature(self, t, theta ):
-
-        spline = interpolate.splrep(t, theta)
-        n = len(t)
-
-        val = 0.0
-
-        # loop over all segments
-        for k in range(1,n):
-
-            ta = t[k-1]
-            tb = t[k]
+    # same as strip_curvatures, but returns arrays of tau, kappa_g and kappa_n for a whole t array
+    def strip_curvatures_many(self, t: np.ndarray, theta_T: np.ndarray = 0.0, dtheta_T_ds: np.ndarray = 0.0):
+        t = np.asarray(t, dtype=float).reshape(-1)
+        v = self.v_many(t)
+        a = self.a_many(t)
+        b_jerk = self.b_many(t)
 
-            # loop over all integration points
-            val_k = 0
-            for i in range(self._nintpoints):
-                tk = 0.5*((1-self._intpoints[i])*ta + ( 1 + self._intpoints[i])*tb)
-                theta_k = interpolate.splev(tk, spline, der=0)
-                dtheta_dt = interpolate.splev(tk, spline, der=1)
+        v_norm = np.linalg.norm(v, axis=1)
+        vxa = np.cross(v, a)
+        nvxa = np.linalg.norm(vxa, axis=1)
 
-                tau, kappa_g, kappa_n = self.strip_curvatures(tk, theta_k, dtheta_dt )
+        kappa_frenet = nvxa / (v_norm ** 3)
+        tau_frenet = np.einsum('ij,ij->i', vxa, b_jerk) / (nvxa ** 2)
 
-                val_k += self._weights[i] * kappa_g * kappa_g
+        tau = tau_frenet + dtheta_T_ds
+        kappa_g = np.sin(theta_T) * kappa_frenet
+        kappa_n = np.cos(theta_T) * kappa_frenet
 
-            val_k *= (tb - ta) * 0.5
+        return tau, kappa_g, kappa_n
 
-            val += val_k
+    # Gauss points and weights of all segments from ta[k] to tb[k], one row per segment
+    def _segment_quadrature(self, ta: np.ndarray, tb: np.ndarray ):
+        ta = ta[:, None]
+        tb = tb[:, None]
+        tq = 0.5*((1-self._intpoints)*ta + ( 1 + self._intpoints)*tb)
+        wq = self._weights * (tb - ta) * 0.5
+        return tq, wq
 
-        return val
+    # value to minimize using SLSQP (not needed for CCT)
+    def _integrate_geodesic_curvature(self, t, theta ):
+        return self.twist_objective( t, 'global' ).geodesic_curvature( theta )
 
     def _integrate_torsion(self, t, theta ):
-
-
-        n = len(t)
-
-        val = 0.0
-
-        # loop over all segments
-        for k in range(1,n):
-
-            k0 = max(k-3,0)
-            k1 = min(k+3,n)
-            spline = interpolate.splrep(t[k0:k1], theta[k0:k1])
-            ta = t[k-1]
-            tb = t[k]
-
-            # loop over all integration points
-            val_k = 0
-            for i in range(self._nintpoints):
-                tk = 0.5*((1-self._intpoints[i])*ta + ( 1 + self._intpoints[i])*tb)
-                theta_k = interpolate.splev(tk, spline, der=0)
-                dtheta_dt = interpolate.splev(tk, spline, der=1)
-
-                tau, kappa_g, kappa_n = self.strip_curvatures(tk, theta_k, dtheta_dt )
-
-                val_k += self._weights[i] * tau * tau
-
-            val_k *= (tb - ta) * 0.5
-
-            val += val_k
-
-        return val
\ No newline at end of file
+        return self.twist_objective( t, 'local' ).torsion( theta )
@@ -1,10 +1,13 @@
-import math
+from concurrent.futures import ProcessPoolExecutor
+
+import hashlib
 
 import numpy as np
 import scipy.optimize
-from fontTools.ttLib.tables.S_V_G_ import doc_index_entry_format_0
+import scipy.stats
 
 from frenet.Basecurve import Basecurve
+from frenet.CurveCache import CurveCache
 
 def _make_poly( x0: float, f0: float, df0: float, x1: float, f1: float, x2: float, f2: float, df2: float ):
 
@@ -47,18 +50,51 @@ def _make_poly( x0: float, f0: float, df0: float, x1: float, f1: float, x2: floa
     f[4] = df2
     return  np.linalg.solve(V,f)
 
+# objective and its exact gradient with respect to the four control values
 def _optimize_cct_torsion( x: np.ndarray, curve: Basecurve ):
-    curve.ca = _make_poly(0,0, 0, x[0], x[1], 1, 0, 0)
-    curve.cb = _make_poly(0,0, 0, x[2], x[3], 1, 0, 0)
+
+    # the polynomials are linear in the control values x[1], x[3]: c = x[1] * g
+    ga = _make_poly(0,0, 0, x[0], 1, 1, 0, 0)
+    gb = _make_poly(0,0, 0, x[2], 1, 1, 0, 0)
+
+    curve.ca = x[1] * ga
+    curve.cb = x[3] * gb
 
     curve._compute_torsion()
-    #g = curve._integrate_geodesic_curvature(curve.t, curve.theta)
-    g = curve._integrate_torsion( curve.t, curve.theta )
-    return g
+
+    # theta vanishes on the body, so only the end regions change between iterations
+    objective = curve.twist_objective( curve.t, 'local', curve._end_mask() )
+    #g = objective.geodesic_curvature(curve.theta)
+    g, dg_dtheta = objective.torsion( curve.theta, gradient=True )
+
+    # moving the control point x[0] changes the row of V that holds it, so dc/dx[0] = -x[1] * p'(x[0]) * g
+    m0, xi0, m1, xi1 = curve._end_coordinates()
+    dg = np.zeros(4)
+    for k, m, xi, gc in ( (0, m0, xi0, ga), (2, m1, xi1, gb) ):
+        dtheta = np.polyval( gc, xi ) * np.pi
+        dg[k] = -x[k+1] * np.polyval( np.polyder( gc ), x[k] ) * np.dot( dg_dtheta[m], dtheta )
+        dg[k+1] = np.dot( dg_dtheta[m], dtheta )
+
+    return g, dg
+
+# the curve each worker process of a multi-start search optimizes
+_worker_curve = None
+
+def _init_worker( curve: Basecurve ):
+    global _worker_curve
+    _worker_curve = curve
+
+# one local SLSQP run, returns the local minimum and its value
+def _local_fit( x0: np.ndarray, curve: Basecurve = None ):
+    if curve is None :
+        curve = _worker_curve
+    res = scipy.optimize.minimize(_optimize_cct_torsion, x0, args=curve, method='SLSQP', jac=True,
+                            options={'ftol': curve.ftol})
+    return res.x, res.fun, res.success
 
 class BasecurveCCT( Basecurve ) :
 
-    def __init__(self, R1: float, R2: float, pitch: float, angle: float, nturns: int ):
+    def __init__(self, R1: float, R2: float, pitch: float, angle: float, nturns: int, cache: CurveCache = None ):
 
         Basecurve.__init__( self )
         self._isCCT = True
@@ -88,179 +124,268 @@ class BasecurveCCT( Basecurve ) :
         self.cz0 = np.zeros(8)
         self.cx1 = np.zeros(8)
         self.cz1 = np.zeros(8)
+        self._update_derivatives()
 
         self.ca = np.zeros(3)
         self.cb = np.zeros(3)
 
         self._is_initialized = False
 
-        self._init_polys()
+        # optimizer settings
+        self.ftol = 1e-3
 
-        x0 = 0.5 * np.ones(4)
+        # optimized control values of the end twist and the local minima found on the way
+        self.x = None
+        self.local_minima = []
 
-        res = scipy.optimize.minimize(_optimize_cct_torsion, x0, args=self, method='SLSQP',
-                                options={'ftol': 1e-3, 'eps': 0.01})
+        # optional on-disk store of optimized parameters
+        self.cache = cache
+        self._cache_params = { 'R1': float(R1), 'R2': float(R2), 'pitch': float(pitch), 'angle': float(angle), 'nturns': int(nturns),
+                               'num_points_per_turn': self.num_points_per_turn }
 
-        print( res.x )
-        #_optimize_cct_torsion( res.x , self )
+        # the centerline is cheap, the twist is optimized by fit() when theta is first needed
+        self._init_polys()
+
+    # the twist along t, triggers the optimization on first access
+    @property
+    def theta(self):
+        if self._theta is None and self._is_initialized :
+            self.fit()
+        return self._theta
+
+    @theta.setter
+    def theta(self, value: np.ndarray ):
+        self._theta = value
+
+    # optimizes the end twist, x0 is an initial guess for the four control values
+    # or a neighbouring BasecurveCCT whose solution is used as warm start
+    def fit(self, x0 = None ):
+
+        if self._load_cached():
+            return self.x
+
+        if isinstance( x0, BasecurveCCT ):
+            x0 = x0.x
+        if x0 is None :
+            x0 = self.x
+        if x0 is None :
+            x0 = 0.5 * np.ones(4)
+
+        x, fun, success = _local_fit( np.asarray( x0, dtype=float ), self )
+
+        _optimize_cct_torsion( x , self )
+        self.x = x
+        self.local_minima = [ ( x, fun ) ]
+        self._store_cached()
+
+        return self.x
+
+    # searches for the global minimum from nstarts starting points spread over the control values,
+    # running the local optimizations on a pool of processes (processes = 1 runs them here)
+    # all distinct local minima are kept in local_minima as ( x, value ) sorted by value
+    def fit_multistart(self, nstarts: int = 16, processes: int = None, seed: int = 0 ):
+
+        method = 'SLSQP-multistart-' + str(nstarts) + '-' + str(seed)
+        if self._load_cached( method ):
+            return self.x
+
+        # the default start plus a scrambled Halton sequence, the control points stay inside (0,1)
+        lower = np.array([0.05, -0.5, 0.05, -0.5])
+        upper = np.array([0.95, 0.5, 0.95, 0.5])
+        starts = [ 0.5 * np.ones(4) ]
+        if nstarts > 1 :
+            sample = scipy.stats.qmc.Halton( 4, seed=seed ).random( nstarts - 1 )
+            starts += list( scipy.stats.qmc.scale( sample, lower, upper ) )
+
+        if processes == 1 :
+            results = [ _local_fit( x0, self ) for x0 in starts ]
+        else:
+            with ProcessPoolExecutor( max_workers=processes, initializer=_init_worker, initargs=(self,) ) as pool:
+                results = list( pool.map( _local_fit, starts ) )
+
+        # distinct local minima, best first
+        self.local_minima = []
+        for x, fun, success in sorted( results, key=lambda r: r[1] ):
+            if not np.isfinite( fun ):
+                continue
+            if all( np.linalg.norm( x - y ) > 1e-4 for y, f in self.local_minima ):
+                self.local_minima.append( ( x, fun ) )
+
+        if len( self.local_minima ) == 0 :
+            raise Exception('no finite local minimum in ' + str( len(starts) ) + ' starts of fit_multistart')
+
+        _optimize_cct_torsion( self.local_minima[0][0], self )
+        self.x = self.local_minima[0][0]
+        self._store_cached( method )
+
+        return self.x
+
+    def _cache_key(self, method: str ):
+        grid = hashlib.sha1( np.ascontiguousarray( self.t ).tobytes() ).hexdigest()
+        return self.cache.key( dict( self._cache_params, method=method, ftol=self.ftol, grid=grid ) )
+
+    # replaces the uniform nodes by curvature-adaptive ones (see Basecurve.resample),
+    # in the 'frenet' mode the twist is fitted on the old nodes first to place the new ones,
+    # then it has to be fitted again, the previous solution is kept as warm start
+    def resample(self, chord_tol: float, angle_tol: float ):
+        super().resample( chord_tol, angle_tol )
+        self._theta = None
+        return self.t
+
+    # restore the optimized state from the cache, returns False if there is nothing to restore
+    def _load_cached(self, method: str = 'SLSQP' ):
+        if self.cache is None :
+            return False
+
+        entry = self.cache.load( self._cache_key( method ) )
+        if entry is None :
+            return False
+
+        self.cx0 = entry['cx0']
+        self.cz0 = entry['cz0']
+        self.cx1 = entry['cx1']
+        self.cz1 = entry['cz1']
+        self._update_derivatives()
+        self._is_initialized = True
+        self._invalidate()
+
+        self.x = entry['x']
+        self.ca = entry['ca']
+        self.cb = entry['cb']
+        self.theta = entry['theta']
+        self.local_minima = list( zip( entry['minima_x'], entry['minima_fun'] ) )
+        return True
+
+    def _store_cached(self, method: str = 'SLSQP' ):
+        if self.cache is None :
+            return
+
+        self.cache.store( self._cache_key( method ), { 'x': self.x, 'ca': self.ca, 'cb': self.cb,
+                                               'cx0': self.cx0, 'cz0': self.cz0, 'cx1': self.cx1, 'cz1': self.cz1,
+                                               'theta': self.theta,
+                                               'minima_x': np.array( [ x for x, f in self.local_minima ] ).reshape(-1,4),
+                                               'minima_fun': np.array( [ f for x, f in self.local_minima ] ) } )
+
+    # nodes in the two polynomial end regions, theta is zero everywhere else
+    def _end_mask(self):
+        return ( self.t < self._ta ) | ( self.t > self._tb )
+
+    # masks and local coordinates xi of the nodes in both end regions, xi = 0 at the joins
+    def _end_coordinates(self):
+        m0 = self.t < self._ta
+        xi0 = ( self._ta - self.t[m0] ) / self._ta
+        m1 = self.t > self._tb
+        xi1 = ( self.t[m1] - self._tb ) / ( self.tmax - self._tb )
+        return m0, xi0, m1, xi1
 
     def _compute_torsion(self):
         self.theta = np.zeros(self.numpoints)
-        for k in range(self.numpoints):
-            t = self.t[k]
-            if t < self._ta :
-                xi = ( self._ta - t ) / self._ta
-                self.theta[k] = np.polyval(self.ca, xi) * np.pi
-            elif t > self._tb :
-                xi = ( t - self._tb ) / ( self.tmax - self._tb )
-                self.theta[k] = np.polyval(self.cb, xi)  * np.pi
 
-    def r( self, t: float):
-        x = np.zeros(3)
-
-        if t < self._ta and self._is_initialized :
-            x[0] =  np.polyval( self.cx0, t )
-            f = x[0]/self.R1
-            x[1] = self.R2 * math.sqrt(1-f*f)
-            x[2] = np.polyval( self.cz0, t )
-        elif t > self._tb and self._is_initialized:
-            x[0] = np.polyval(self.cx1, t)
-            f = x[0] / self.R1
-            x[1] = self.R2 * math.sqrt(1 - f * f)
-            x[2] = np.polyval(self.cz1, t)
-        else:
-            # Russenschuck (3.34)
-            x[0] = self.R1 * np.cos(t)
-            x[1] = self.R2 * np.sin(t)
-            x[2] = self.R2 * ( np.sin(t) * self.tan_alpha + self.q * t )
+        m0, xi0, m1, xi1 = self._end_coordinates()
+        self.theta[m0] = np.polyval(self.ca, xi0) * np.pi
+        self.theta[m1] = np.polyval(self.cb, xi1) * np.pi
 
-        return x
+    def r( self, t: float):
+        return self.r_many( np.array([t]) )[0]
 
     def v( self, t: float):
-        dxdt = np.zeros(3)
-        dt = 1e-3
-
-        if t < self._ta and self._is_initialized :
-
-            dxdt[0] =  np.dot(self.cx0, self._deriv1( t ) )
-
-            x0 = np.polyval( self.cx0, t-0.5*dt )
-            y0 = self.R2 * math.sqrt(1-x0*x0/(self.R1*self.R1))
-
-            x1 = np.polyval( self.cx0, t+0.5*dt )
-            y1 = self.R2 * math.sqrt(1 - x1 * x1 / (self.R1 * self.R1))
-            dxdt[1] = (y1-y0)/dt
-            dxdt[2] = np.dot(self.cz0, self._deriv1( t ) )
-
-        elif t > self._tb and self._is_initialized :
-            dxdt[0] =  np.dot(self.cx1, self._deriv1( t ) )
-            x0 = np.polyval( self.cx1, t-0.5*dt )
-            y0 = self.R2 * math.sqrt(1-x0*x0/(self.R1*self.R1))
-            x1 = np.polyval( self.cx1, t+0.5*dt )
-            y1 = self.R2 * math.sqrt(1 - x1 * x1 / (self.R1 * self.R1))
-            dxdt[1] = (y1-y0)/dt
-            dxdt[2] = np.dot(self.cz1, self._deriv1( t ) )
-        else:
-            dxdt[0] = -self.R1 * np.sin(t)
-            dxdt[1] = self.R2 * np.cos(t)
-            dxdt[2] = self.R2 * ( np.cos(t) * self.tan_alpha + self.q )
-        return dxdt
+        return self.v_many( np.array([t]) )[0]
 
     def a( self, t: float ):
-
-        d2xdt2 = np.zeros(3)
-        dt = 1e-3
-
-        if t < self._ta and self._is_initialized :
-            d2xdt2[0] = np.dot(self.cx0, self._deriv2(t))
-
-
-
-            x0 = np.polyval(self.cx0, t - dt)
-            x1 = np.polyval(self.cx0, t)
-            x2 = np.polyval(self.cx0, t + dt)
-
-            y0 = self.R2 * math.sqrt(1 - x0 * x0 / (self.R1 * self.R1))
-            y1 = self.R2 * math.sqrt(1 - x1 * x1 / (self.R1 * self.R1))
-            y2 = self.R2 * math.sqrt(1 - x2 * x2 / (self.R1 * self.R1))
-
-            dy0 = (y1-y0)/dt
-            dy1 = (y2-y1)/dt
-            d2xdt2[1] = (dy1-dy0)/dt
-            d2xdt2[2] = np.dot(self.cz0, self._deriv2(t))
-        elif t > self._tb and self._is_initialized:
-            d2xdt2[0] = np.dot(self.cx1, self._deriv2(t))
-
-            x0 = np.polyval(self.cx1, t - dt)
-            x1 = np.polyval(self.cx1, t)
-            x2 = np.polyval(self.cx1, t + dt)
-
-            y0 = self.R2 * math.sqrt(1 - x0 * x0 / (self.R1 * self.R1))
-            y1 = self.R2 * math.sqrt(1 - x1 * x1 / (self.R1 * self.R1))
-            y2 = self.R2 * math.sqrt(1 - x2 * x2 / (self.R1 * self.R1))
-
-            dy0 = (y1 - y0) / dt
-            dy1 = (y2 - y1) / dt
-            d2xdt2[1] = -(dy1 - dy0) / dt
-            d2xdt2[2] = np.dot(self.cz1, self._deriv2(t))
-        else:
-            d2xdt2[0] = -self.R1 * np.cos(t)
-            d2xdt2[1] = -self.R2 * np.sin(t)
-            d2xdt2[2] =  self.R2 * ( -np.sin(t) * self.tan_alpha )
-
-        return d2xdt2
+        return self.a_many( np.array([t]) )[0]
 
     def b(self, t: float ):
-        d3xdt3 = np.zeros(3)
-        dt = 1e-3
-        if t < self._ta and self._is_initialized :
-            x0 = np.polyval(self.cx0, t - 1.5*dt)
-            x1 = np.polyval(self.cx0, t - 0.5*dt)
-            x2 = np.polyval(self.cx0, t + 0.5*dt)
-            x3 = np.polyval(self.cx0, t + 1.5*dt)
-            y0 = self.R2 * math.sqrt(1 - x0 * x0 / (self.R1 * self.R1))
-            y1 = self.R2 * math.sqrt(1 - x1 * x1 / (self.R1 * self.R1))
-            y2 = self.R2 * math.sqrt(1 - x2 * x2 / (self.R1 * self.R1))
-            y3 = self.R2 * math.sqrt(1 - x3 * x3 / (self.R1 * self.R1))
-
-            dy0 = (y1 - y0) / dt # @ - dt
-            dy1 = (y2 - y1) / dt # @ 0
-            dy2 = (y3 - y2) / dt # @ + dt
-
-            ddy0 = (dy1-dy0)  / dt # @ -0.5 dt
-            ddy1 = ( dy2-dy1) / dt # @ 0.5 dt
-
-            d3xdt3[0] = np.dot(self.cx0, self._deriv3(t))
-            d3xdt3[1] = (ddy1-ddy0)/dt
-            d3xdt3[2] = np.dot(self.cz0, self._deriv3(t))
-        elif t > self._tb and self._is_initialized :
-            x0 = np.polyval(self.cx1, t - 1.5*dt)
-            x1 = np.polyval(self.cx1, t - 0.5*dt)
-            x2 = np.polyval(self.cx1, t + 0.5*dt)
-            x3 = np.polyval(self.cx1, t + 1.5*dt)
-            y0 = self.R2 * math.sqrt(1 - x0 * x0 / (self.R1 * self.R1))
-            y1 = self.R2 * math.sqrt(1 - x1 * x1 / (self.R1 * self.R1))
-            y2 = self.R2 * math.sqrt(1 - x2 * x2 / (self.R1 * self.R1))
-            y3 = self.R2 * math.sqrt(1 - x3 * x3 / (self.R1 * self.R1))
-
-            dy0 = (y1 - y0) / dt # @ - dt
-            dy1 = (y2 - y1) / dt # @ 0
-            dy2 = (y3 - y2) / dt # @ + dt
-
-            ddy0 = (dy1-dy0)  / dt # @ -0.5 dt
-            ddy1 = ( dy2-dy1) / dt # @ 0.5 dt
-
-            d3xdt3[0] = np.dot(self.cx1, self._deriv3(t))
-            d3xdt3[1] = (ddy1-ddy0)/dt
-            d3xdt3[2] = np.dot(self.cz1, self._deriv3(t))
+        return self.b_many( np.array([t]) )[0]
+
+    # the end polynomials join the body with continuous derivatives up to the third
+    def breakpoints(self):
+        return np.array( [ self.tmin, self._ta, self._tb, self.tmax ] )
+
+    # masks for the polynomial start region, the polynomial end region and the body
+    def _regions(self, t: np.ndarray ):
+        t = np.asarray( t, dtype=float ).reshape(-1)
+        if self._is_initialized :
+            m0 = t < self._ta
+            m1 = t > self._tb
         else:
-            d3xdt3[0] = self.R1 * np.sin(t)
-            d3xdt3[1] = -self.R2 * np.cos(t)
-            d3xdt3[2] = self.R2 * (-np.cos(t) * self.tan_alpha)
-        return d3xdt3
-
+            m0 = np.zeros( len(t), dtype=bool )
+            m1 = np.zeros( len(t), dtype=bool )
+        return t, m0, m1, ~( m0 | m1 )
+
+    # y-coordinate on the elliptic cylinder for a given x-coordinate
+    def _end_y(self, x: np.ndarray ):
+        return self.R2 * np.sqrt( np.maximum( 1 - x*x/(self.R1*self.R1), 0.0 ) )
+
+    def r_many(self, t: np.ndarray ):
+        return self._jet( t, 0 )[0]
+
+    def v_many(self, t: np.ndarray ):
+        return self._jet( t, 1 )[1]
+
+    def a_many(self, t: np.ndarray ):
+        return self._jet( t, 2 )[2]
+
+    def b_many(self, t: np.ndarray ):
+        return self._jet( t, 3 )[3]
+
+    def jet(self, t: np.ndarray ):
+        return tuple( self._jet( t, 3 ) )
+
+    # position and derivatives up to the given order, sharing the trig and polynomial evaluations
+    def _jet(self, t: np.ndarray, order: int ):
+        t, m0, m1, mb = self._regions( t )
+        d = [ np.zeros( [len(t), 3] ) for k in range( order + 1 ) ]
+
+        # Russenschuck (3.34) and its derivatives
+        tk = t[mb]
+        c = np.cos(tk)
+        s = np.sin(tk)
+        body = ( ( self.R1 * c,  self.R2 * s, self.R2 * ( s * self.tan_alpha + self.q * tk ) ),
+                 ( -self.R1 * s, self.R2 * c, self.R2 * ( c * self.tan_alpha + self.q ) ),
+                 ( -self.R1 * c, -self.R2 * s, -self.R2 * s * self.tan_alpha ),
+                 ( self.R1 * s, -self.R2 * c, -self.R2 * c * self.tan_alpha ) )
+        for k in range( order + 1 ):
+            d[k][mb,0], d[k][mb,1], d[k][mb,2] = body[k]
+
+        for m, tc, cx, cz, dcx, dcz in ( (m0, self._ta, self.cx0, self.cz0, self._dcx0, self._dcz0),
+                                         (m1, self._tb, self.cx1, self.cz1, self._dcx1, self._dcz1) ):
+            u = t[m] - tc
+            x = [ np.polyval( cx, u ) ] + [ np.polyval( dcx[k], u ) for k in range( order ) ]
+            z = [ np.polyval( cz, u ) ] + [ np.polyval( dcz[k], u ) for k in range( order ) ]
+
+            # 1 - x^2/R1^2 = -e*(2*sigma + e) with x = R1*(sigma + e) and x(0) = sigma*R1 at the join,
+            # e is taken from the polynomial without its constant term to avoid cancellation.
+            # this needs sigma^2 = 1, which holds as the joins _ta and _tb are multiples of pi where x = +-R1
+            sigma = cx[-1] / self.R1
+            e = u * np.polyval( cx[:-1], u ) / self.R1
+            w = np.maximum( np.sqrt( np.maximum( -e * ( 2*sigma + e ), 0.0 ) ), np.finfo(float).tiny )
+
+            # y = R2 * sqrt(1 - x^2/R1^2), derivatives by the chain rule (Faa di Bruno)
+            RR = self.R1 * self.R1
+            y = [ self.R2 * w ]
+            if order > 0 :
+                h1 = -self.R2 * x[0] / ( RR * w )
+                y.append( h1 * x[1] )
+            if order > 1 :
+                h2 = -self.R2 / ( RR * w**3 )
+                y.append( h2 * x[1]**2 + h1 * x[2] )
+            if order > 2 :
+                h3 = -3.0 * self.R2 * x[0] / ( RR * RR * w**5 )
+                y.append( h3 * x[1]**3 + 3.0 * h2 * x[1] * x[2] + h1 * x[3] )
+
+            for k in range( order + 1 ):
+                d[k][m,0] = x[k]
+                d[k][m,1] = y[k]
+                d[k][m,2] = z[k]
+
+        return d
+
+    # the end polynomials are written in u = t - _ta and u = t - _tb to keep them well conditioned
     def _init_polys(self):
 
+        # evaluate the body at the joins, not the previous polynomials
+        self._is_initialized = False
+
         f0 = np.zeros(3)
         f0[0] = 0
         f0[1] = self.R2
@@ -276,8 +401,8 @@ class BasecurveCCT( Basecurve ) :
 
         df = f1-f0
 
-        self.cx0 = self._compute_values(0, self.tmin, f0, df0, ddf0, dddf0, self._ta, f1, df1, ddf1, dddf1 )
-        self.cz0 = self._compute_values(2, self.tmin, f0, df0, ddf0, dddf0, self._ta, f1, df1, ddf1, dddf1)
+        self.cx0 = self._compute_values(0, self.tmin - self._ta, f0, df0, ddf0, dddf0, 0.0, f1, df1, ddf1, dddf1 )
+        self.cz0 = self._compute_values(2, self.tmin - self._ta, f0, df0, ddf0, dddf0, 0.0, f1, df1, ddf1, dddf1)
 
         dz = self.r(self.tmin+0.5*np.pi)[2]-self.r(self.tmin)[2]
 
@@ -293,11 +418,29 @@ class BasecurveCCT( Basecurve ) :
         ddf1 = self.a(self._tb)
         dddf1 = self.b(self._tb)
 
-        self.cx1 = self._compute_values(0, self.tmax, f0, df0, ddf0, dddf0, self._tb, f1, df1, ddf1, dddf1)
-        self.cz1 = self._compute_values(2, self.tmax, f0, df0, ddf0, dddf0, self._tb, f1, df1, ddf1, dddf1)
+        self.cx1 = self._compute_values(0, self.tmax - self._tb, f0, df0, ddf0, dddf0, 0.0, f1, df1, ddf1, dddf1)
+        self.cz1 = self._compute_values(2, self.tmax - self._tb, f0, df0, ddf0, dddf0, 0.0, f1, df1, ddf1, dddf1)
+
+        # the constant terms are the join values, keep them exact
+        self.cx0[-1] = self.r(self._ta)[0]
+        self.cz0[-1] = self.r(self._ta)[2]
+        self.cx1[-1] = f1[0]
+        self.cz1[-1] = f1[2]
+
+        self._update_derivatives()
 
         self._is_initialized  = True
 
+        # the geometry has changed
+        self._invalidate()
+
+    # coefficients of the first three derivatives of the end polynomials
+    def _update_derivatives(self):
+        self._dcx0 = [ np.polyder( self.cx0, k ) for k in (1, 2, 3) ]
+        self._dcz0 = [ np.polyder( self.cz0, k ) for k in (1, 2, 3) ]
+        self._dcx1 = [ np.polyder( self.cx1, k ) for k in (1, 2, 3) ]
+        self._dcz1 = [ np.polyder( self.cz1, k ) for k in (1, 2, 3) ]
+
     def _compute_values(self, k: int, t0: float , f0: float, df0: float, ddf0: float, dddf0: float, t1: float, f1: float, df1: float, ddf1: float, dddf1: float ):
 
         V = np.zeros([8,8])
@@ -379,36 +522,6 @@ class BasecurveCCT( Basecurve ) :
         c = np.linalg.solve( V, f )
         return c
 
-    def _deriv1(self, t: float ):
-        f = np.zeros(8)
-        f[0] = 7 * t * t * t * t * t * t
-        f[1] = 6 * t * t * t * t * t
-        f[2] = 5 * t * t * t * t
-        f[3] = 4 * t * t * t
-        f[4] = 3 * t * t
-        f[5] = 2 * t
-        f[6] = 1
-        return f
-
-    def _deriv2(self, t: float ):
-        f = np.zeros(8)
-        f[0] = 42 * t * t * t * t * t
-        f[1] = 30 * t * t * t * t
-        f[2] = 20 * t * t * t
-        f[3] = 12 * t * t
-        f[4] = 6 * t
-        f[5] = 2
-        return f
-
-    def _deriv3(self, t: float ):
-        f = np.zeros(8)
-        f[0] = 210 * t * t * t * t
-        f[1] = 120 * t * t * t
-        f[2] = 60 * t * t
-        f[3] = 24 * t
-        f[4] = 6
-        return f
-
     def transform(self, t: float, theta_T: float = 0.0 ):
 
         if t == 0 :
@@ -441,3 +554,24 @@ class BasecurveCCT( Basecurve ) :
 
         return R
 
+    # Frenet vectors, with the fixed terminal orientation at t = tmin and t = tmax
+    def _frenet_many(self, t: np.ndarray ):
+
+        m0 = t == self.tmin
+        m1 = t == self.tmax
+        inner = ~( m0 | m1 )
+
+        N = np.zeros( [len(t), 3] )
+        B = np.zeros( [len(t), 3] )
+        T = np.zeros( [len(t), 3] )
+        N[inner], B[inner], T[inner] = Basecurve._frenet_many( self, t[inner] )
+
+        N[m0] = [-1.0, 0.0, 0.0]
+        B[m0] = [0.0, -1.0, 0.0]
+        T[m0] = [0.0, 0.0, 1.0]
+
+        N[m1] = [1.0, 0.0, 0.0]
+        B[m1] = [0.0, 1.0, 0.0]
+        T[m1] = [0.0, 0.0, 1.0]
+
+        return N, B, T
@@ -0,0 +1,108 @@
+import numpy as np
+from scipy import interpolate
+from scipy.sparse.linalg import spsolve
+
+from frenet.Basecurve import Basecurve
+
+class BasecurveSpline( Basecurve ) :
+
+    # basecurve through sampled points, for example a measured winding path.
+    # points are the (N,3) samples in order along the curve, the parameter is their chord length.
+    # with num_knots set, a least-squares spline with that many interior knots is fitted,
+    # with smoothing set, the number of knots is chosen by FITPACK (see scipy.interpolate.splprep),
+    # otherwise the spline interpolates all samples
+    def __init__(self, points: np.ndarray, degree: int = 5, num_knots: int = None, smoothing: float = None, numpoints: int = None ):
+
+        Basecurve.__init__( self )
+
+        points = np.asarray( points, dtype=float )
+        if points.ndim != 2 or points.shape[1] != 3 :
+            raise Exception('expected an array of shape (N,3), got ' + str(points.shape))
+
+        # repeated samples have no chord length
+        d = np.linalg.norm( np.diff( points, axis=0 ), axis=1 )
+        keep = np.concatenate( ( [True], d > 0 ) )
+        points = points[keep]
+        u = np.zeros( len(points) )
+        u[1:] = np.cumsum( d[keep[1:]] )
+
+        if len(u) <= degree :
+            raise Exception('need more than ' + str(degree) + ' distinct points')
+
+        self.degree = degree
+
+        if num_knots is not None :
+            spline = self._fit_lsq( u, points, degree, num_knots )
+        elif smoothing is not None :
+            tck, u = interpolate.splprep( points.T, u=u, k=degree, s=smoothing )
+            spline = interpolate.BSpline( tck[0], np.array( tck[1] ).T, degree )
+        else:
+            spline = interpolate.make_interp_spline( u, points, k=degree )
+
+        # position and its first three derivatives
+        self._splines = [ spline ] + [ spline.derivative( k ) for k in range( 1, 4 ) ]
+
+        if numpoints is None :
+            numpoints = min( len(u), 1024 )
+        self.numpoints = numpoints
+        self.tmin = u[0]
+        self.tmax = u[-1]
+        self.t = np.linspace( self.tmin, self.tmax, numpoints )
+
+        # measured paths have no twist of their own, the Frenet frame flips at inflections
+        self.frame_mode = 'rmf'
+
+        self.arclength_table( self.tmin, self.tmax, numpoints )
+
+    # least-squares spline with interior knots at quantiles of the parameter,
+    # the normal equations of the sparse design matrix are banded
+    def _fit_lsq(self, u: np.ndarray, points: np.ndarray, degree: int, num_knots: int ):
+        inner = np.quantile( u, np.linspace( 0, 1, num_knots + 2 )[1:-1] )
+        knots = np.concatenate( ( np.full( degree + 1, u[0] ), inner, np.full( degree + 1, u[-1] ) ) )
+
+        A = interpolate.BSpline.design_matrix( u, knots, degree )
+        c = spsolve( ( A.T @ A ).tocsc(), A.T @ points )
+        return interpolate.BSpline( knots, c, degree )
+
+    # reads the samples from a .npy file (memory mapped) or a text file with x, y, z in the first columns
+    @classmethod
+    def from_file(cls, path: str, **kwargs ):
+        if path.endswith('.npy'):
+            points = np.load( path, mmap_mode='r' )
+        else:
+            points = np.loadtxt( path, usecols=(0, 1, 2), ndmin=2 )
+        return cls( points, **kwargs )
+
+    # the knot interval search is fast for sorted input, so unsorted parameters are evaluated in order
+    def _eval(self, t: np.ndarray, order: int ):
+        t = np.asarray( t, dtype=float ).reshape(-1)
+        if np.all( t[1:] >= t[:-1] ):
+            return self._splines[order]( t )
+        perm = np.argsort( t )
+        values = np.empty( [len(t), 3] )
+        values[perm] = self._splines[order]( t[perm] )
+        return values
+
+    def r( self, t: float ):
+        return self._splines[0]( t )
+
+    def v( self, t: float ):
+        return self._splines[1]( t )
+
+    def a( self, t: float ):
+        return self._splines[2]( t )
+
+    def b( self, t: float ):
+        return self._splines[3]( t )
+
+    def r_many( self, t: np.ndarray ):
+        return self._eval( t, 0 )
+
+    def v_many( self, t: np.ndarray ):
+        return self._eval( t, 1 )
+
+    def a_many( self, t: np.ndarray ):
+        return self._eval( t, 2 )
+
+    def b_many( self, t: np.ndarray ):
+        return self._eval( t, 3 )
@@ -0,0 +1,180 @@
+import numpy as np
+from numpy.polynomial import chebyshev
+
+from frenet.Basecurve import Basecurve
+
+class BasecurveSurrogate( Basecurve ) :
+
+    # piecewise Chebyshev approximation of another basecurve, panels are bisected until the
+    # trailing coefficients are below tol relative to the size of the curve
+    def __init__(self, basecurve: Basecurve, tol: float = 1e-12, degree: int = 12, max_panels: int = 100000 ):
+
+        self.basecurve = basecurve
+        Basecurve.__init__( self )
+        self.num_points_per_turn = basecurve.num_points_per_turn
+        self.frame_mode = basecurve.frame_mode
+
+        self.tol = tol
+        self.degree = degree
+
+        self._fit( basecurve.breakpoints(), max_panels )
+
+    # nodes and twist are those of the wrapped curve
+    @property
+    def t(self):
+        return self.basecurve.t
+
+    @t.setter
+    def t(self, value: np.ndarray ):
+        if value is not None :
+            self.basecurve.t = value
+
+    @property
+    def theta(self):
+        return self.basecurve.theta
+
+    @theta.setter
+    def theta(self, value: np.ndarray ):
+        if value is not None :
+            self.basecurve.theta = value
+
+    def breakpoints(self):
+        return self.basecurve.breakpoints()
+
+    # the nodes and the twist belong to the wrapped curve, which also refits its twist if needed
+    def resample(self, chord_tol: float, angle_tol: float ):
+        self.basecurve.resample( chord_tol, angle_tol )
+        self._invalidate()
+        return self.t
+
+    def _fit(self, breakpoints: np.ndarray, max_panels: int ):
+
+        # Chebyshev points on [-1,1]
+        n = self.degree + 1
+        xc = np.cos( np.pi * ( np.arange( n ) + 0.5 ) / n )
+
+        a = np.array( breakpoints[:-1], dtype=float )
+        b = np.array( breakpoints[1:], dtype=float )
+
+        scale = None
+        panels = []
+
+        while len(a) > 0 :
+            tq = 0.5*( a + b )[:, None] + 0.5*( b - a )[:, None] * xc
+            f = self.basecurve.r_many( tq.reshape(-1) ).reshape( len(a), n, 3 )
+            if scale is None :
+                scale = max( np.abs( f ).max(), 1.0 )
+
+            # coefficients of all panels and components at once
+            c = chebyshev.chebfit( xc, f.transpose( 1, 0, 2 ).reshape( n, -1 ), self.degree )
+            c = c.reshape( n, len(a), 3 ).transpose( 1, 0, 2 )
+
+            tail = np.abs( c[:, -3:, :] ).max( axis=(1, 2) )
+            done = tail <= self.tol * scale
+            if len(panels) + 2*len(a) > max_panels :
+                done[:] = True
+
+            panels += [ ( a[k], b[k], c[k] ) for k in np.flatnonzero( done ) ]
+
+            keep = ~done
+            m = 0.5*( a[keep] + b[keep] )
+            a, b = np.concatenate( ( a[keep], m ) ), np.concatenate( ( m, b[keep] ) )
+
+        panels.sort( key=lambda p: p[0] )
+        self.edges = np.array( [ p[0] for p in panels ] + [ panels[-1][1] ] )
+        h = np.diff( self.edges )
+
+        # coefficients of r and its first three derivatives, scaled to d/dt
+        self._coeffs = [ np.array( [ p[2] for p in panels ] ) ]
+        for k in range(3):
+            d = chebyshev.chebder( self._coeffs[-1], axis=1 ) * ( 2.0 / h )[:, None, None]
+            self._coeffs.append( d )
+
+        # uniform cells no wider than the smallest panel (at most 2^20 of them),
+        # each cell stores the panel that contains its start
+        length = self.edges[-1] - self.edges[0]
+        self._cell = max( h.min(), length / 2**20 )
+        start = self.edges[0] + self._cell * np.arange( int( np.ceil( length / self._cell ) ) + 1 )
+        self._cell_panel = np.clip( np.searchsorted( self.edges, start, side='right' ) - 1, 0, len(h) - 1 )
+
+    # panel of each entry in t, points outside the edges belong to the first or last panel
+    def _panels(self, t: np.ndarray ):
+        npanels = len(self.edges) - 1
+        c = np.fmin( np.fmax( ( t - self.edges[0] ) / self._cell, 0 ), len(self._cell_panel) - 1 )
+        k = self._cell_panel[c.astype( np.intp )]
+
+        # a cell may reach into the following panels
+        i = np.flatnonzero( ( k < npanels - 1 ) & ( t >= self.edges[np.minimum( k+1, npanels )] ) )
+        while len(i) > 0 :
+            k[i] += 1
+            i = i[ ( k[i] < npanels - 1 ) & ( t[i] >= self.edges[np.minimum( k[i]+1, npanels )] ) ]
+        return k
+
+    # value of the derivative of the given order for all entries in t,
+    # points are grouped by panel so that each series is one product of the Chebyshev matrix
+    # and the coefficients, sorted input is grouped already
+    def _eval(self, t: np.ndarray, order: int ):
+        t = np.asarray( t, dtype=float ).reshape(-1)
+        npanels = len(self.edges) - 1
+
+        if np.all( t[1:] >= t[:-1] ):
+            perm = None
+            bounds = np.searchsorted( t, self.edges )
+            bounds[0] = 0
+            bounds[-1] = len(t)
+        else:
+            # radix sort on the panel index
+            k = self._panels( t )
+            perm = np.argsort( k.astype( np.uint16 ) if npanels <= 65536 else k, kind='stable' )
+            bounds = np.concatenate( ( [0], np.cumsum( np.bincount( k, minlength=npanels ) ) ) )
+            t = t[perm]
+
+        c = self._coeffs[order]
+        values = np.empty( [len(t), 3] )
+        for p in np.flatnonzero( np.diff( bounds ) ):
+            s = slice( bounds[p], bounds[p+1] )
+            a = self.edges[p]
+            b = self.edges[p+1]
+            x = ( 2.0*t[s] - a - b ) / ( b - a )
+            values[s] = chebyshev.chebvander( x, c.shape[1] - 1 ) @ c[p]
+
+        if perm is None :
+            return values
+
+        # scatter whole rows at once through a view with one element per row
+        result = np.empty_like( values )
+        row = np.dtype( ( np.void, values.strides[0] ) )
+        result.view( row ).reshape(-1)[perm] = values.view( row ).reshape(-1)
+        return result
+
+    def r( self, t: float ):
+        return self._eval( t, 0 )[0]
+
+    def v( self, t: float ):
+        return self._eval( t, 1 )[0]
+
+    def a( self, t: float ):
+        return self._eval( t, 2 )[0]
+
+    def b( self, t: float ):
+        return self._eval( t, 3 )[0]
+
+    def r_many( self, t: np.ndarray ):
+        return self._eval( t, 0 )
+
+    def v_many( self, t: np.ndarray ):
+        return self._eval( t, 1 )
+
+    def a_many( self, t: np.ndarray ):
+        return self._eval( t, 2 )
+
+    def b_many( self, t: np.ndarray ):
+        return self._eval( t, 3 )
+
+    # the wrapped curve may fix the frames at its terminals
+    def _frenet_many(self, t: np.ndarray ):
+        N, B, T = Basecurve._frenet_many( self, t )
+        m = ( t == self.edges[0] ) | ( t == self.edges[-1] )
+        if np.any( m ):
+            N[m], B[m], T[m] = self.basecurve._frenet_many( t[m] )
+        return N, B, T
@@ -0,0 +1,77 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+class CurveCache:
+
+    # format of the stored entries, bump when the content changes
+    version = 1
+
+    def __init__(self, path: str = "", max_entries: int = 256 ):
+
+        # the directory holding one .npz file per entry
+        if path == "":
+            path = os.environ.get( 'FRENET_CACHE', os.path.join( os.path.expanduser('~'), '.cache', 'frenet' ) )
+        self.path = path
+
+        # least recently used entries are removed beyond this number
+        self.max_entries = max_entries
+
+    # hash of the parameters that determine an entry
+    def key(self, params: dict ):
+        params = dict( params, version=self.version )
+        return hashlib.sha1( json.dumps( params, sort_keys=True ).encode('utf-8') ).hexdigest()
+
+    def _file(self, key: str ):
+        return os.path.join( self.path, key + '.npz' )
+
+    # the stored arrays, or None if the entry does not exist
+    def load(self, key: str ):
+        file = self._file( key )
+        if not os.path.exists( file ):
+            return None
+
+        try:
+            with np.load( file ) as data:
+                entry = { k: data[k] for k in data.files }
+        except (OSError, ValueError):
+            return None
+
+        # mark as recently used
+        os.utime( file )
+
+        return entry
+
+    def store(self, key: str, data: dict ):
+        os.makedirs( self.path, exist_ok=True )
+
+        # write to a temporary file first so that readers never see partial entries
+        file = self._file( key )
+        tmp = file + '.' + str(os.getpid()) + '.tmp.npz'
+        np.savez( tmp, **data )
+        os.replace( tmp, file )
+
+        self._evict()
+
+    def clear(self):
+        for f in self._entries():
+            os.remove( f )
+
+    def _entries(self):
+        if not os.path.isdir( self.path ):
+            return []
+        return [ os.path.join( self.path, f ) for f in os.listdir( self.path ) if f.endswith('.npz') and not f.endswith('.tmp.npz') ]
+
+    def _evict(self):
+        files = self._entries()
+        if len(files) <= self.max_entries :
+            return
+
+        files.sort( key=lambda f: os.path.getmtime( f ) )
+        for f in files[:len(files) - self.max_entries]:
+            try:
+                os.remove( f )
+            except FileNotFoundError:
+                pass
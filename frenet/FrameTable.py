@@ -0,0 +1,26 @@
+import numpy as np
+
+class FrameTable:
+
+    # centers and strip frames of a basecurve at its nodes, computed once and shared by all tapes
+    def __init__(self, basecurve, theta: np.ndarray ):
+
+        # nodes and twist the table was made for
+        self.t = np.array( basecurve.t, dtype=float )
+        self.theta = np.array( theta, dtype=float )
+
+        self.centers = basecurve.r_many( self.t )
+        self.frames = basecurve.transform_many( self.t, self.theta )
+
+        # tangents at the terminals and lengths of the first and last segment, for the end extensions
+        self.v0 = basecurve.v( self.t[0] )
+        self.v1 = basecurve.v( self.t[-1] )
+        self.s0, self.s1 = basecurve.segment_lengths( self.t[[0, -2]], self.t[[1, -1]] )
+
+    # true if the table belongs to the nodes t and twist theta
+    def matches(self, t: np.ndarray, theta: np.ndarray ):
+        return ( self.t is t or np.array_equal( self.t, t ) ) and np.array_equal( self.theta, theta )
+
+    # positions at all nodes of the point with coordinates (n, b) in the strip frame
+    def offset(self, n: float, b: float ):
+        return self.centers + np.dot( self.frames, np.array( [ n, b, 0.0 ] ) )
@@ -1,6 +1,8 @@
 import numpy as np
 
 class Point:
+    __slots__ = ( 'id', 'x', 'y', 'z', 'res' )
+
     def __init__(self, x: float, y: float, z: float, res: float ):
         self.id = 0
         self.x = x
@@ -0,0 +1,145 @@
+import numpy as np
+from scipy.spatial import cKDTree
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from frenet.Point import Point
+
+# template of a Point line with the given number of decimals for the coordinates
+def _point_line( decimals: int ):
+    c = "%." + str(decimals) + "f"
+    return "Point(%d) = {" + c + "," + c + "," + c + ",%.3f};\n"
+
+class PointTable:
+
+    # coordinates, mesh resolution and id of all points, stored as columns.
+    # points are referred to by their row index, rows are only added at the end
+    def __init__(self, capacity: int = 1024 ):
+        self.coords = np.zeros( [capacity, 3] )
+        self.res = np.zeros( capacity )
+        self.ids = np.zeros( capacity, dtype=int )
+        self.size = 0
+
+        # rows that are written, the others share the id of a coincident point
+        self.unique = None
+
+    # table on existing coordinate and resolution columns, for example memory mapped ones
+    @classmethod
+    def from_arrays(cls, coords: np.ndarray, res: np.ndarray ):
+        table = cls( 0 )
+        table.coords = coords
+        table.res = res
+        table.ids = np.zeros( len(res), dtype=int )
+        table.size = len(res)
+        return table
+
+    def __len__(self):
+        return self.size
+
+    # the row k as a Point object
+    def __getitem__(self, k: int ):
+        if k < 0 :
+            k += self.size
+        P = Point( *self.coords[k].tolist(), float( self.res[k] ) )
+        P.id = int( self.ids[k] )
+        return P
+
+    # appends the rows of coords with resolution res and returns their indices
+    def add(self, coords: np.ndarray, res: float ):
+        coords = np.asarray( coords, dtype=float ).reshape(-1,3)
+        n = len(coords)
+        self._reserve( self.size + n )
+
+        rows = np.arange( self.size, self.size + n )
+        self.coords[rows] = coords
+        self.res[rows] = res
+        self.size += n
+
+        return rows
+
+    # the capacity grows by doubling so that adding is amortized linear
+    def _reserve(self, n: int ):
+        if n <= len(self.res):
+            return
+        m = max( n, 2*len(self.res) )
+
+        coords = np.zeros( [m, 3] )
+        coords[:self.size] = self.coords[:self.size]
+        self.coords = coords
+
+        res = np.zeros( m )
+        res[:self.size] = self.res[:self.size]
+        self.res = res
+
+        ids = np.zeros( m, dtype=int )
+        ids[:self.size] = self.ids[:self.size]
+        self.ids = ids
+
+    # drops all rows from n on
+    def truncate(self, n: int ):
+        self.size = min( n, self.size )
+
+    # numbers all points in row order, starting with first.
+    # points closer than tol are merged, they get the id of the first of them
+    def assign_ids(self, first: int = 1, tol: float = None ):
+        rep = self.representatives( tol )
+        self.unique = rep == np.arange( self.size )
+
+        ids = np.zeros( self.size, dtype=int )
+        ids[self.unique] = np.arange( first, first + np.count_nonzero( self.unique ) )
+        self.ids[:self.size] = ids[rep]
+
+    # for each row the first row of its group of points closer than tol (chains are merged)
+    def representatives(self, tol: float = None ):
+        rows = np.arange( self.size )
+        if tol is None or tol <= 0 or self.size < 2 :
+            return rows
+
+        pairs = cKDTree( self.coords[:self.size] ).query_pairs( tol, output_type='ndarray' )
+        if len(pairs) == 0 :
+            return rows
+
+        graph = coo_matrix( ( np.ones( len(pairs) ), ( pairs[:,0], pairs[:,1] ) ), shape=( self.size, self.size ) )
+        n, labels = connected_components( graph, directed=False )
+
+        # the first row of each group, rows are visited in order
+        first = np.full( n, self.size )
+        np.minimum.at( first, labels, rows )
+        return first[labels]
+
+    # lower and upper corner of the box around the first n points (all points if n is None)
+    def bounding_box(self, n: int = None ):
+        if n is None :
+            n = self.size
+        if n == 0 :
+            return None
+        return self.coords[:n].min( axis=0 ), self.coords[:n].max( axis=0 )
+
+    # writes the Point lines of all rows to the open file f, without the merged ones.
+    # precision is 'fixed' with the given decimals, 'shortest' for the shortest string that reads back
+    # to the same float, or 'tolerance' for rounding errors below rel_tol times the mesh size of each point.
+    # each chunk of rows is formatted in one pass, so memory does not grow with the number of points
+    def write(self, f, chunk: int = 65536, precision: str = 'fixed', decimals: int = 12, rel_tol: float = 1e-6 ):
+        for a in range( 0, self.size, chunk ):
+            rows = np.arange( a, min( a + chunk, self.size ) )
+            if self.unique is not None :
+                rows = rows[self.unique[rows]]
+
+            if precision == 'fixed' :
+                lines = _point_line( decimals ) * len(rows)
+            elif precision == 'shortest' :
+                lines = "Point(%d) = {%r,%r,%r,%r};\n" * len(rows)
+            elif precision == 'tolerance' :
+                d = self.decimals( rows, rel_tol )
+                templates = { k: _point_line( k ) for k in np.unique( d ).tolist() }
+                lines = "".join( [ templates[k] for k in d.tolist() ] )
+            else:
+                raise Exception('unknown precision ' + str(precision))
+
+            data = np.column_stack( ( self.ids[rows], self.coords[rows], self.res[rows] ) )
+            f.write( lines % tuple( data.ravel().tolist() ) )
+
+    # number of decimals that keeps the rounding error of the given rows below rel_tol times their mesh size
+    def decimals(self, rows: np.ndarray, rel_tol: float ):
+        h = rel_tol * self.res[rows]
+        return np.clip( np.ceil( -np.log10( 2.0 * h ) ), 0, 17 ).astype( int )
@@ -0,0 +1,119 @@
+import json
+import os
+
+import numpy as np
+
+from frenet.PointTable import PointTable
+from frenet.Topology import Topology, EntityTable
+
+class Snapshot:
+
+    # format of the snapshot directory, bump when the content changes
+    version = 1
+
+    # reads the snapshot in the directory path, with mmap_mode the arrays are memory mapped (see numpy.load)
+    def __init__(self, path: str, mmap_mode: str = 'r' ):
+        self.path = path
+
+        file = os.path.join( path, 'meta.json' )
+        if not os.path.exists( file ):
+            raise Exception('no snapshot in ' + str(path))
+
+        with open( file, 'r', encoding='utf-8' ) as f:
+            self.meta = json.load( f )
+
+        if self.meta['version'] != self.version :
+            raise Exception('snapshot version ' + str(self.meta['version']) + ' is not supported')
+
+        def load( name ):
+            return np.load( os.path.join( path, name + '.npy' ), mmap_mode=mmap_mode )
+
+        # samples of the basecurve at its nodes
+        self.t = load('t')
+        self.theta = load('theta')
+        self.centers = load('centers')
+        self.frames = load('frames')
+
+        # first and last row of the left and right edge of each tape in the point table
+        self.tape_rows = load('tape_rows')
+
+        points = PointTable.from_arrays( load('coords'), load('res') )
+        self.topology = Topology( points )
+        for kind in Topology.kinds :
+            names = self.meta['labels'][kind]
+            labels = [ names[k] for k in load( kind + '_labels' ).tolist() ]
+            table = EntityTable.from_arrays( labels, load( kind + '_offsets' ), load( kind + '_children' ), load( kind + '_signs' ) )
+            setattr( self.topology, kind, table )
+
+    @property
+    def points(self):
+        return self.topology.points
+
+    def left(self, tape: int ):
+        a, b = self.tape_rows[tape, 0:2]
+        return self.points.coords[a:b]
+
+    def right(self, tape: int ):
+        a, b = self.tape_rows[tape, 2:4]
+        return self.points.coords[a:b]
+
+    # writes the .geo file of the snapshot, the keyword arguments set the precision (see Geometry.save)
+    def save(self, path: str, **kwargs ):
+        self.topology.assign_ids( self.meta['merge_tol'] )
+        with open( path, 'w', encoding='utf-8', buffering=1 << 20 ) as File:
+            self.topology.write( File, **kwargs )
+        print('saving ' + path)
+
+    # writes the arrays of a geometry, including its air domain, into the directory path
+    @classmethod
+    def write(cls, geometry, path: str ):
+        os.makedirs( path, exist_ok=True )
+
+        # an older snapshot in the same place is incomplete until the new meta file is written
+        meta_file = os.path.join( path, 'meta.json' )
+        if os.path.exists( meta_file ):
+            os.remove( meta_file )
+
+        def store( name, data ):
+            np.save( os.path.join( path, name + '.npy' ), np.ascontiguousarray( data ) )
+
+        table = geometry.basecurve.frame_table( geometry.frame_mode )
+        store( 't', table.t )
+        store( 'theta', table.theta )
+        store( 'centers', table.centers )
+        store( 'frames', table.frames )
+
+        store( 'tape_rows', np.array( [ [ t.left_index[0], t.left_index[-1] + 1, t.right_index[0], t.right_index[-1] + 1 ]
+                                        for t in geometry.tapes ], dtype=int ).reshape(-1,4) )
+
+        T = geometry.topology
+        store( 'coords', T.points.coords[:len(T.points)] )
+        store( 'res', T.points.res[:len(T.points)] )
+
+        labels = {}
+        for kind in Topology.kinds :
+            e = getattr( T, kind )
+            names = sorted( set( e.labels ) )
+            labels[kind] = names
+            code = { n: k for k, n in enumerate( names ) }
+            store( kind + '_labels', np.array( [ code[n] for n in e.labels ], dtype=np.int8 ) )
+            store( kind + '_offsets', e.offsets )
+            store( kind + '_children', e.children )
+            store( kind + '_signs', e.signs.astype( np.int8 ) )
+
+        meta = {
+            'version': cls.version,
+            'basecurve': type( geometry.basecurve ).__name__,
+            'basecurve_params': getattr( geometry.basecurve, '_cache_params', {} ),
+            'frame_mode': geometry.frame_mode or geometry.basecurve.frame_mode,
+            'numtapes': len( geometry.tapes ),
+            'tape_res': geometry.tape_res,
+            'air_res': geometry.air_res,
+            'air_radius': geometry.air_radius,
+            'merge_tol': geometry.merge_tol,
+            'labels': labels
+        }
+
+        # the meta file comes last, a directory without it is not a complete snapshot
+        with open( meta_file, 'w', encoding='utf-8' ) as f:
+            json.dump( meta, f, indent=1 )
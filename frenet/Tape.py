@@ -1,29 +1,74 @@
 import math
 
 import numpy as np
-from frenet.Curve import Curve
 from frenet.Basecurve import Basecurve
 from frenet.CrossSection import CrossSection
-from frenet.Point import Point
-from frenet.Surface import *
+from frenet.Topology import Topology
+
+# basecurve, cross section, resolution and frame mode shared by the worker processes of a parallel build
+_worker_args = None
+
+def _init_worker( basecurve: Basecurve, cross_section: CrossSection, tape_res: float, frame_mode: str ):
+    global _worker_args
+    _worker_args = ( basecurve, cross_section, tape_res, frame_mode )
+
+# left and right edge of one tape, one row per point,
+# with make_ends the edges continue straight along the tangents at the terminals for delta_z
+def _edges( basecurve: Basecurve, cross_section: CrossSection, index: int, frame_mode: str = None, make_ends: bool = True, delta_z: float = 200 ):
+    table = basecurve.frame_table( frame_mode )
+
+    # left points, thickness direction (n) and width direction (b)
+    left = table.offset( cross_section.leftpoints[index][0], cross_section.leftpoints[index][1] )
+
+    # right points
+    right = table.offset( cross_section.rightpoints[index][0], cross_section.rightpoints[index][1] )
+
+    if make_ends:
+        # the number of steps approximates the length of the first and last segment
+        xi0 = _extension( -delta_z / table.v0[2], table.s0, delta_z )[::-1]
+        xi1 = _extension( delta_z / table.v1[2], table.s1, delta_z )
+
+        left  = np.concatenate( ( left[0]  + np.outer( xi0, table.v0 ), left,  left[-1]  + np.outer( xi1, table.v1 ) ) )
+        right = np.concatenate( ( right[0] + np.outer( xi0, table.v0 ), right, right[-1] + np.outer( xi1, table.v1 ) ) )
+
+    return left, right
+
+# help parameters of an extension, ordered away from the terminal, without the terminal itself
+def _extension( xi: float, s: float, delta_z: float ):
+    n = round( delta_z / s )
+    return np.linspace( 0, xi, n )[1:]
+
+# edges of one tape, computed in a worker process
+def _make_edges( index: int ):
+    basecurve, cross_section, tape_res, frame_mode = _worker_args
+    return _edges( basecurve, cross_section, index, frame_mode )
 
 class Tape:
 
-    def __init__(self, basecurve: Basecurve, cross_section: CrossSection, index: int, tape_res: float ):
+    # edges are the left and right arrays if they were computed elsewhere,
+    # topology holds the points and entities of the geometry, a tape on its own gets a new one
+    def __init__(self, basecurve: Basecurve, cross_section: CrossSection, index: int, tape_res: float, frame_mode: str = None, edges: tuple = None, topology: Topology = None ):
         self.index = index
         self.id = index + 1
         self.basecurve = basecurve
         self.cross_section = cross_section
 
-        self.points_left  = []
-        self.points_right = []
+        # 'frenet' or 'rmf', None uses the mode of the basecurve
+        self.frame_mode = frame_mode
+
+        if topology is None :
+            topology = Topology()
+        self.topology = topology
+        self.points = topology.points
 
         # todo: to be set into parameter object
         self.resolution = tape_res
         self.make_ends = True
         self.delta_z = 200
 
-        self._make_points()
+        if edges is None :
+            edges = self._make_points()
+        self._add_points( *edges )
 
         self.curves = []
         self.curveloops = []
@@ -40,128 +85,42 @@ class Tape:
         self.z0 = np.nan
         self.z1 = np.nan
 
+    # edges of the tape, one row per point
     def _make_points(self):
-        n = len(self.basecurve.t)
-
-        for k in range(n):
-            t = self.basecurve.t[k]
-            m = self.basecurve.r(t)
-            if len(self.basecurve.theta ) > 0 :
-                theta = self.basecurve.theta[k]
-            else:
-                theta = 0.0
-
-            T = self.basecurve.transform(t, theta )
-
-            # left point
-            p0 = np.array([
-                self.cross_section.leftpoints[self.index][0],  # thickness direction (n)
-                self.cross_section.leftpoints[self.index][1],  # width direction (b)
-                0.0
-            ])
-            p = m+ np.dot(T,p0)
-            self.points_left.append(Point(p[0], p[1], p[2], self.resolution))
-
-            # right point
-            q0 = np.array([
-                self.cross_section.rightpoints[self.index][0],
-                self.cross_section.rightpoints[self.index][1],
-                0.0
-            ])
-            q = m +  np.dot(T,q0)
-
-            self.points_right.append(Point(q[0], q[1], q[2], self.resolution))
-
-        if self.make_ends:
-            # get coordinates of first point
-
-
-            # get derivative
-            v = self.basecurve.v( self.basecurve.t[0])
-
-            # get help parameter
-            xi0 = -self.delta_z / v[2]
-
-            # compute length of first segment
-            s = self.basecurve.segment_length( self.basecurve.t[0], self.basecurve.t[1])
-
-            # approximate number of steps
-            n = round( self.delta_z / s )
-
-            # values to add
-            xi = np.linspace( 0, xi0, n )
-
-            # crate left points
-            x0 = self.points_left[0].x
-            y0 = self.points_left[0].y
-            z0 = self.points_left[0].z
-            for k in range(1,n) :
-                P = Point( x0 + xi[k] * v[0], y0+ xi[k] * v[1], z0 + xi[k]*v[2], self.resolution)
-                self.points_left.insert( 0, P )
-
-            # crate right points
-            x0 = self.points_right[0].x
-            y0 = self.points_right[0].y
-            z0 = self.points_right[0].z
-            for k in range(1, n):
-                P = Point(x0 + xi[k] * v[0], y0 + xi[k] * v[1], z0 + xi[k] * v[2], self.resolution)
-                self.points_right.insert(0, P)
-
-            # end extension
-            v = self.basecurve.v(self.basecurve.t[-1])
-
-            # get help parameter
-            xi0 = self.delta_z / v[2]
-
-            # compute length of first segment
-            s = self.basecurve.segment_length( self.basecurve.t[-2], self.basecurve.t[-1])
-
-            # approximate number of steps
-            n = round( self.delta_z / s )
-
-            # values to add
-            xi = np.linspace( 0, xi0, n )
-
-            x0 = self.points_left[-1].x
-            y0 = self.points_left[-1].y
-            z0 = self.points_left[-1].z
-            for k in range(1, n):
-                P = Point(x0 + xi[k] * v[0], y0 + xi[k] * v[1], z0 + xi[k] * v[2], self.resolution)
-                self.points_left.append(P)
-
-            x0 = self.points_right[-1].x
-            y0 = self.points_right[-1].y
-            z0 = self.points_right[-1].z
-            for k in range(1, n):
-                P = Point(x0 + xi[k] * v[0], y0 + xi[k] * v[1], z0 + xi[k] * v[2], self.resolution)
-                self.points_right.append(P)
+        return _edges( self.basecurve, self.cross_section, self.index, self.frame_mode, self.make_ends, self.delta_z )
 
-    def _make_curves(self):
+    # the left points come first, then the right points
+    def _add_points(self, left: np.ndarray, right: np.ndarray ):
+        self.left_index  = self.points.add( left, self.resolution )
+        self.right_index = self.points.add( right, self.resolution )
+
+        # first and last point of each edge, shared with the end curves and the tape blocks
+        self.ends_left  = [ self.left_index[0], self.left_index[-1] ]
+        self.ends_right = [ self.right_index[0], self.right_index[-1] ]
 
-        F = Curve("Line")
-        F.points.append(self.points_left[0])
-        F.points.append(self.points_right[0])
-        self.curves.append(F)
+    # coordinates of the left edge
+    @property
+    def left(self):
+        return self.points.coords[self.left_index]
 
-        R = Curve("Spline")
-        R.points = self.points_right
-        self.curves.append(R)
+    # coordinates of the right edge
+    @property
+    def right(self):
+        return self.points.coords[self.right_index]
 
-        B = Curve("Line")
-        B.points.append(self.points_right[-1])
-        B.points.append(self.points_left[-1])
-        self.curves.append(B)
+    # the curves, loops and surfaces are indices into the topology
+    def _make_curves(self):
+        T = self.topology
 
-        L = Curve("Spline")
-        for p in self.points_left :
-            L.points.insert(0, p)
+        F = T.add_curve( "Line", [ self.ends_left[0], self.ends_right[0] ] )
+        R = T.add_curve( "Spline", self.right_index )
+        B = T.add_curve( "Line", [ self.ends_right[-1], self.ends_left[-1] ] )
+        L = T.add_curve( "Spline", self.left_index[::-1] )
 
-        self.curves.append(L)
+        self.curves = [ F, R, B, L ]
 
     def _make_surface(self):
-        L = CurveLoop()
-        L.curves = self.curves
+        L = self.topology.add_curve_loop( self.curves )
         self.curveloops.append( L )
-        S = Surface()
-        S.loops.append( L )
-        self.surfaces.append(S)
\ No newline at end of file
+        S = self.topology.add_surface( [ L ] )
+        self.surfaces.append( S )
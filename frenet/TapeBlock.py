@@ -1,7 +1,4 @@
-
 from frenet.Tape import Tape
-from frenet.Surface import *
-from frenet.Volume import *
 
 class TapeBlock:
 
@@ -9,7 +6,9 @@ class TapeBlock:
 
         self.bottom = bottom
         self.top = top
+        self.topology = bottom.topology
 
+        # indices into the topology
         self.curves = []
         self.curveloops = []
         self.surfaces = []
@@ -20,119 +19,41 @@ class TapeBlock:
         self.back = None
         self.left = None
         self.right = None
+
+        # curve loops of the front and back surfaces
+        self.front_loop = None
+        self.back_loop = None
         self._make_surfaces()
 
     def _make_surfaces(self):
-        l0 = Curve("Line")
-        l0.points.append(self.bottom.points_left[0])
-        l0.points.append(self.top.points_left[0])
-        self.curves.append(l0)
-
-        r0 = Curve("Line")
-        r0.points.append(self.bottom.points_right[0])
-        r0.points.append(self.top.points_right[0])
-        self.curves.append(r0)
-
-        l1 = Curve("Line")
-        l1.points.append(self.bottom.points_left[-1])
-        l1.points.append(self.top.points_left[-1])
-        self.curves.append(l1)
-
-        r1 = Curve("Line")
-        r1.points.append(self.bottom.points_right[-1])
-        r1.points.append(self.top.points_right[-1])
-        self.curves.append(r1)
-
-        L0 = CurveLoop()
-        L0.curves.append(self.bottom.curves[0])
-        L0.signs.append(1)
-        L0.curves.append(r0)
-        L0.signs.append(1)
-        L0.curves.append(self.top.curves[0])
-        L0.signs.append(-1)
-        L0.curves.append(l0)
-        L0.signs.append(-1)
-        self.curveloops.append(L0)
-
-        S0 = Surface()
-        S0.is_plane = True
-        S0.loops.append(L0)
-        self.surfaces.append(S0)
+        T = self.topology
+
+        l0 = T.add_curve( "Line", [ self.bottom.ends_left[0], self.top.ends_left[0] ] )
+        r0 = T.add_curve( "Line", [ self.bottom.ends_right[0], self.top.ends_right[0] ] )
+        l1 = T.add_curve( "Line", [ self.bottom.ends_left[-1], self.top.ends_left[-1] ] )
+        r1 = T.add_curve( "Line", [ self.bottom.ends_right[-1], self.top.ends_right[-1] ] )
+        self.curves += [ l0, r0, l1, r1 ]
+
+        L0 = T.add_curve_loop( [ self.bottom.curves[0], r0, self.top.curves[0], l0 ], [ 1, 1, -1, -1 ] )
+        L1 = T.add_curve_loop( [ self.bottom.curves[-2], l1, self.top.curves[-2], r1 ], [ 1, 1, -1, -1 ] )
+        L2 = T.add_curve_loop( [ l0, self.bottom.curves[3], l1, self.top.curves[3] ], [ 1, 1, -1, -1 ] )
+        L3 = T.add_curve_loop( [ r0, self.top.curves[1], r1, self.bottom.curves[1] ], [ 1, 1, -1, -1 ] )
+        self.curveloops += [ L0, L1, L2, L3 ]
+        self.front_loop = L0
+        self.back_loop = L1
+
+        S0 = T.add_surface( [ L0 ], plane=True )
+        S1 = T.add_surface( [ L1 ], plane=True )
+        S2 = T.add_surface( [ L2 ] )
+        S3 = T.add_surface( [ L3 ] )
+        self.surfaces += [ S0, S1, S2, S3 ]
         self.front = S0
-
-        L1 = CurveLoop()
-        L1.curves.append(self.bottom.curves[-2])
-        L1.signs.append(1)
-        L1.curves.append(l1)
-        L1.signs.append(1)
-        L1.curves.append(self.top.curves[-2])
-        L1.signs.append(-1)
-        L1.curves.append(r1)
-        L1.signs.append(-1)
-        self.curveloops.append(L1)
-
-        S1 = Surface()
-        S1.is_plane = True
-        S1.loops.append(L1)
-        self.surfaces.append(S1)
         self.back = S1
-
-        L2 = CurveLoop()
-        L2.curves.append(l0)
-        L2.signs.append(1)
-        L2.curves.append(self.bottom.curves[3])
-        L2.signs.append(1)
-        L2.curves.append(l1)
-        L2.signs.append(-1)
-        L2.curves.append(self.top.curves[3])
-        L2.signs.append(-1)
-        self.curveloops.append(L2)
-
-        S2 = Surface()
-        S2.loops.append(L2)
-        self.surfaces.append(S2)
         self.left = S2
-
-        L3 = CurveLoop()
-        L3.curves.append(r0)
-        L3.signs.append(1)
-        L3.curves.append(self.top.curves[1])
-        L3.signs.append(1)
-        L3.curves.append(r1)
-        L3.signs.append(-1)
-        L3.curves.append(self.bottom.curves[1])
-        L3.signs.append(-1)
-        self.curveloops.append(L3)
-
-        S3 = Surface()
-        S3.loops.append(L3)
-        self.surfaces.append(S3)
         self.right = S3
 
-        V = Volume()
-
-        L = SurfaceLoop()
-
-        for s in self.bottom.surfaces:
-            L.surfaces.append(s)
-
-        for s in self.top.surfaces:
-            L.surfaces.append(s)
-
-        L.surfaces.append( S0 )
-        L.surfaces.append( S1 )
-
-        L.surfaces.append( S2 )
-        L.surfaces.append( S3 )
-
-        V.loops.append( L )
+        L = T.add_surface_loop( self.bottom.surfaces + self.top.surfaces + [ S0, S1, S2, S3 ] )
         self.surfaceloops.append( L )
-        self.volumes.append( V )
-
-
-
-
-
-
-
 
+        V = T.add_volume( [ L ] )
+        self.volumes.append( V )
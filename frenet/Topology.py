@@ -0,0 +1,280 @@
+import numpy as np
+
+from frenet.PointTable import PointTable
+
+# a curve whose points coincide after merging, splines may only collapse completely
+def _degenerate_curve( label: str, points: list ):
+    if label == 'Circle' :
+        return len( set( points ) ) < 3
+    if label == 'Line' :
+        return points[0] == points[-1]
+    if any( a == b for a, b in zip( points[:-1], points[1:] ) ):
+        if len( set( points ) ) == 1 :
+            return True
+        raise Exception( label + ' with repeated points after merging points' )
+    return False
+
+# removes pairs of a curve and its reverse from a loop
+def _cancel( loop: list ):
+    result = []
+    for c in loop :
+        if -c in result :
+            result.remove( -c )
+        else:
+            result.append( c )
+    return result
+
+class EntityTable:
+
+    # entities of one kind in CSR form, the children of entity k are
+    # children[offsets[k]:offsets[k+1]] with the orientations in signs at the same positions.
+    # entities are numbered in the order they were added
+    def __init__(self):
+        self.labels = []
+        self.ids = np.zeros( 0, dtype=int )
+
+        # after merging points: the entities that are written, and their reduced child ids
+        self.unique = None
+        self.reduced = None
+
+        # entities added since the arrays were last assembled
+        self._pending = []
+
+        self._offsets = np.zeros( 1, dtype=int )
+        self._children = np.zeros( 0, dtype=int )
+        self._signs = np.zeros( 0, dtype=int )
+
+    # table on existing CSR arrays, for example memory mapped ones
+    @classmethod
+    def from_arrays(cls, labels: list, offsets: np.ndarray, children: np.ndarray, signs: np.ndarray ):
+        table = cls()
+        table.labels = list( labels )
+        table._offsets = offsets
+        table._children = children
+        table._signs = signs
+        return table
+
+    def __len__(self):
+        return len(self.labels)
+
+    # adds one entity and returns its index
+    def add(self, label: str, children, signs = None ):
+        children = np.asarray( children, dtype=int ).reshape(-1)
+        if signs is None :
+            signs = np.ones( len(children), dtype=int )
+        self.labels.append( label )
+        self._pending.append( ( children, np.asarray( signs, dtype=int ).reshape(-1) ) )
+        return len(self.labels) - 1
+
+    def _assemble(self):
+        if len(self._pending) == 0 :
+            return
+        sizes = np.array( [ len(c) for c, s in self._pending ], dtype=int )
+        self._offsets = np.concatenate( ( self._offsets, self._offsets[-1] + np.cumsum( sizes ) ) )
+        self._children = np.concatenate( [ self._children ] + [ c for c, s in self._pending ] )
+        self._signs = np.concatenate( [ self._signs ] + [ s for c, s in self._pending ] )
+        self._pending = []
+
+    @property
+    def offsets(self):
+        self._assemble()
+        return self._offsets
+
+    @property
+    def children(self):
+        self._assemble()
+        return self._children
+
+    @property
+    def signs(self):
+        self._assemble()
+        return self._signs
+
+    # drops all entities from n on
+    def truncate(self, n: int ):
+        self._assemble()
+        if n >= len(self.labels):
+            return
+        del self.labels[n:]
+        self.unique = None
+        self.reduced = None
+        self._offsets = self._offsets[:n+1]
+        self._children = self._children[:self._offsets[-1]]
+        self._signs = self._signs[:self._offsets[-1]]
+
+    def assign_ids(self, first: int = 1 ):
+        self.ids = np.arange( first, first + len(self.labels) )
+        self.unique = None
+        self.reduced = None
+
+    # numbering after points were merged. child_ids are the ids of the child kind, 0 for vanished
+    # and negative for reversed children. References to vanished children are dropped, an entity
+    # that repeats another one gets its id (negative if reversed) and is not written, entities
+    # that become degenerate get id 0. Returns the new ids
+    def reduce(self, kind: str, child_ids: np.ndarray ):
+        self._assemble()
+        values = ( child_ids[self._children] * self._signs ).tolist()
+        offsets = self._offsets.tolist()
+
+        ids = np.zeros( len(self.labels), dtype=int )
+        self.unique = np.zeros( len(self.labels), dtype=bool )
+        self.reduced = {}
+        seen = {}
+
+        for k, label in enumerate( self.labels ):
+            v = values[offsets[k]:offsets[k+1]]
+
+            if kind == 'curves' :
+                if _degenerate_curve( label, v ):
+                    continue
+            else:
+                outer = v[0] if len(v) > 0 else 0
+                v = [ c for c in v if c != 0 ]
+                if kind == 'curveloops' :
+                    v = _cancel( v )
+                    if len(set(v)) < len(v):
+                        raise Exception('curve loop ' + str(k) + ' runs through a curve twice after merging points')
+                elif kind == 'surfaceloops' :
+                    # a surface on both sides of the shell lies inside it
+                    count = {}
+                    for c in v :
+                        count[abs(c)] = count.get( abs(c), 0 ) + 1
+                    v = [ c for c in v if count[abs(c)] == 1 ]
+                elif outer == 0 :
+                    # surfaces and volumes vanish with their outer boundary
+                    continue
+                if len(v) == 0 :
+                    continue
+                self.reduced[k] = v
+
+            if kind == 'curves' :
+                key = tuple( v )
+                reverse = tuple( v[::-1] )
+            else:
+                key = tuple( sorted( v ) )
+                reverse = tuple( sorted( -c for c in v ) )
+
+            if key in seen :
+                ids[k] = seen[key]
+            elif reverse in seen and kind != 'volumes' :
+                ids[k] = -seen[reverse]
+            else:
+                ids[k] = len(seen) + 1
+                seen[key] = ids[k]
+                self.unique[k] = True
+
+        self.ids = ids
+        return ids
+
+    # writes one line per entity to the open file f, child_ids are the ids of the child entity kind.
+    # with ranges, runs of consecutive ids are written as first:last.
+    # entities are formatted in chunks, so memory does not grow with the size of the geometry
+    def write(self, f, child_ids: np.ndarray, sep: str = ", ", ranges: bool = False, chunk: int = 4096 ):
+        self._assemble()
+        n = len(self.labels)
+        ids = self.ids.tolist()
+
+        # entities reduced after merging points are short, they are written from the reduced ids
+        if self.reduced is not None and len(self.reduced) > 0 :
+            for k0 in range( 0, n, chunk ):
+                f.write( "".join( [ "{:s}({:d}) = {{{:s}}};\n".format( self.labels[k], ids[k], sep.join( map( str, self.reduced[k] ) ) )
+                                    for k in range( k0, min( k0 + chunk, n ) ) if self.unique[k] ] ) )
+            return
+
+        for k0 in range( 0, n, chunk ):
+            k1 = min( k0 + chunk, n )
+            a0 = self._offsets[k0]
+            a1 = self._offsets[k1]
+            values = child_ids[self._children[a0:a1]] * self._signs[a0:a1]
+
+            if ranges :
+                # number of unit steps up and down before each position
+                step = np.diff( values )
+                up = np.concatenate( ( [0], np.cumsum( step == 1 ) ) )
+                down = np.concatenate( ( [0], np.cumsum( step == -1 ) ) )
+
+            values = values.tolist()
+            offsets = ( self._offsets[k0:k1+1] - a0 ).tolist()
+
+            lines = []
+            for k in range( k1 - k0 ):
+                if self.unique is not None and not self.unique[k0+k] :
+                    continue
+                a = offsets[k]
+                b = offsets[k+1]
+                if ranges and b - a > 1 and ( up[b-1] - up[a] == b - a - 1 or down[b-1] - down[a] == b - a - 1 ):
+                    body = "{:d}:{:d}".format( values[a], values[b-1] )
+                else:
+                    body = sep.join( map( str, values[a:b] ) )
+                lines.append( "{:s}({:d}) = {{{:s}}};\n".format( self.labels[k0+k], ids[k0+k], body ) )
+            f.write( "".join( lines ) )
+
+class Topology:
+
+    # points and all entities built on them, every kind is numbered separately starting from 1
+    def __init__(self, points: PointTable = None ):
+        if points is None :
+            points = PointTable()
+        self.points = points
+
+        self.curves = EntityTable()
+        self.curveloops = EntityTable()
+        self.surfaces = EntityTable()
+        self.surfaceloops = EntityTable()
+        self.volumes = EntityTable()
+
+    # curve through the point rows, label is 'Line', 'Spline' or 'Circle'
+    def add_curve(self, label: str, points ):
+        return self.curves.add( label, points )
+
+    def add_curve_loop(self, curves, signs = None ):
+        return self.curveloops.add( "Curve Loop", curves, signs )
+
+    def add_surface(self, loops, plane: bool = False ):
+        return self.surfaces.add( "Plane Surface" if plane else "Surface", loops )
+
+    def add_surface_loop(self, surfaces, signs = None ):
+        return self.surfaceloops.add( "Surface Loop", surfaces, signs )
+
+    def add_volume(self, loops ):
+        return self.volumes.add( "Volume", loops )
+
+    # entity kinds in the order they are written
+    kinds = [ 'curves', 'curveloops', 'surfaces', 'surfaceloops', 'volumes' ]
+
+    def _tables(self):
+        return [ getattr( self, k ) for k in self.kinds ]
+
+    # number of points and entities of each kind, can be passed to truncate
+    def sizes(self):
+        return [ len(self.points) ] + [ len(e) for e in self._tables() ]
+
+    # drops everything that was added after sizes() returned n
+    def truncate(self, n: list ):
+        self.points.truncate( n[0] )
+        for e, m in zip( self._tables(), n[1:] ):
+            e.truncate( m )
+
+    # numbers points and entities in the order they were added,
+    # points closer than tol share one id, so the curves refer to the merged point.
+    # if points were merged, repeated and degenerate entities are removed kind by kind (see EntityTable.reduce)
+    def assign_ids(self, tol: float = None ):
+        self.points.assign_ids( tol=tol )
+        for e in self._tables():
+            e.assign_ids()
+
+        if np.all( self.points.unique ):
+            return
+        ids = self.points.ids[:len(self.points)]
+        for kind in self.kinds :
+            ids = getattr( self, kind ).reduce( kind, ids )
+
+    # writes the .geo lines of all points and entities to the open file f, section by section,
+    # the keyword arguments set the precision of the coordinates (see PointTable.write)
+    def write(self, f, **kwargs ):
+        self.points.write( f, **kwargs )
+        self.curves.write( f, self.points.ids, sep=",", ranges=True )
+        self.curveloops.write( f, self.curves.ids )
+        self.surfaces.write( f, self.curveloops.ids )
+        self.surfaceloops.write( f, self.surfaces.ids )
+        self.volumes.write( f, self.surfaceloops.ids )
@@ -0,0 +1,167 @@
+import numpy as np
+from scipy import interpolate
+from scipy import sparse
+from scipy.sparse.linalg import splu, LinearOperator
+
+class TwistObjective:
+
+    # precomputes everything that does not depend on theta for one t grid
+    # basis = 'local' interpolates theta around each segment from its six neighbouring nodes,
+    # basis = 'global' uses one interpolating spline over all nodes
+    # free marks the nodes where theta may be nonzero, theta is assumed zero everywhere else
+    # so that integration points not influenced by a free node only add a constant
+    def __init__(self, basecurve, t: np.ndarray, basis: str = 'local', free: np.ndarray = None ):
+
+        self.t = np.array( t, dtype=float )
+        self.basis = basis
+
+        n = len(self.t)
+        if free is None :
+            self.free = np.ones( n, dtype=bool )
+        else:
+            self.free = np.array( free, dtype=bool )
+        self._free_index = np.flatnonzero( self.free )
+
+        # integration points and weights of all segments
+        tq, wq = basecurve._segment_quadrature( self.t[:-1], self.t[1:] )
+        nq = tq.shape[1]
+
+        # Frenet torsion and curvature of the basecurve at the integration points
+        tau_frenet, kappa_g, kappa = basecurve.strip_curvatures_many( tq.reshape(-1) )
+
+        # matrices mapping theta at the free nodes to theta and dtheta/dt at the integration points
+        if basis == 'local' :
+            segments = self._active_segments()
+            B0, B1 = self._local_basis( tq, segments )
+            active = ( nq * segments[:, None] + np.arange( nq ) ).reshape(-1)
+        elif basis == 'global' :
+            if len( self._free_index ) > 0 :
+                active = np.arange( tq.size )
+            else:
+                active = np.zeros( 0, dtype=int )
+            B0, B1 = self._global_basis( tq.reshape(-1)[active] )
+        else:
+            raise Exception('unknown basis ' + str(basis))
+
+        # contribution of all integration points where theta vanishes
+        passive = np.ones( len(tau_frenet), dtype=bool )
+        passive[active] = False
+        wq = wq.reshape(-1)
+        self.constant_torsion = np.dot( wq[passive], tau_frenet[passive]**2 )
+
+        self.tq = tq.reshape(-1)[active]
+        self.wq = wq[active]
+        self.tau_frenet = tau_frenet[active]
+        self.kappa = kappa[active]
+        self.B0 = B0
+        self.B1 = B1
+
+    # segments whose interpolation window contains a free node
+    def _active_segments(self):
+        n = len(self.t)
+        count = np.concatenate( ( [0], np.cumsum( self.free ) ) )
+        k = np.arange( 1, n )
+        k0 = np.maximum( k-3, 0 )
+        k1 = np.minimum( k+3, n )
+        return np.flatnonzero( count[k1] > count[k0] )
+
+    def _local_basis(self, tq: np.ndarray, segments: np.ndarray ):
+
+        n = len(self.t)
+        nq = tq.shape[1]
+
+        # column of each node in the reduced matrices
+        column = np.cumsum( self.free ) - 1
+
+        rows = []
+        cols = []
+        vals0 = []
+        vals1 = []
+
+        for i, s in enumerate( segments ):
+            k = s + 1
+            k0 = max(k-3,0)
+            k1 = min(k+3,n)
+            spline = interpolate.make_interp_spline( self.t[k0:k1], np.eye( k1 - k0 ), k=3 )
+
+            f = self.free[k0:k1]
+            r, c = np.meshgrid( np.arange( i*nq, (i+1)*nq ), column[k0:k1][f], indexing='ij' )
+            rows.append( r.reshape(-1) )
+            cols.append( c.reshape(-1) )
+            vals0.append( spline( tq[s] )[:, f].reshape(-1) )
+            vals1.append( spline.derivative()( tq[s] )[:, f].reshape(-1) )
+
+        shape = ( len(segments)*nq, len(self._free_index) )
+
+        if len(segments) == 0 :
+            return sparse.csr_matrix( shape ), sparse.csr_matrix( shape )
+
+        rows = np.concatenate( rows )
+        cols = np.concatenate( cols )
+
+        B0 = sparse.csr_matrix( ( np.concatenate( vals0 ), ( rows, cols ) ), shape=shape )
+        B1 = sparse.csr_matrix( ( np.concatenate( vals1 ), ( rows, cols ) ), shape=shape )
+
+        return B0, B1
+
+    # the global spline couples every node to every integration point, so instead of the dense
+    # basis the operators keep the sparse design matrices at the integration points and solve the
+    # banded collocation system of the not-a-knot interpolant on each product
+    def _global_basis(self, x: np.ndarray ):
+
+        n = len(self.t)
+        m = len(self._free_index)
+
+        if len(x) == 0 :
+            return sparse.csr_matrix( ( 0, m ) ), sparse.csr_matrix( ( 0, m ) )
+
+        k = 3
+        knots = interpolate.make_interp_spline( self.t, np.zeros( n ), k=k ).t
+        lu = splu( interpolate.BSpline.design_matrix( self.t, knots, k ).tocsc() )
+
+        # B-spline coefficients to values and derivatives at x,
+        # the derivative is a degree k-1 spline on the inner knots with differenced coefficients
+        D0 = interpolate.BSpline.design_matrix( x, knots, k ).tocsr()
+        i = np.arange( 1, n )
+        scale = k / ( knots[i+k] - knots[i] )
+        difference = sparse.csr_matrix( ( np.concatenate( ( scale, -scale ) ),
+                                          ( np.concatenate( ( i-1, i-1 ) ), np.concatenate( ( i, i-1 ) ) ) ),
+                                        shape=( n-1, n ) )
+        D1 = ( interpolate.BSpline.design_matrix( x, knots[1:-1], k-1 ) @ difference ).tocsr()
+
+        def expand( values ):
+            full = np.zeros( n )
+            full[self._free_index] = values
+            return full
+
+        def operator( D ):
+            return LinearOperator( ( len(x), m ), dtype=float,
+                                   matvec=lambda v: D @ lu.solve( expand( v.reshape(-1) ) ),
+                                   rmatvec=lambda w: lu.solve( D.T @ w.reshape(-1), trans='T' )[self._free_index] )
+
+        return operator( D0 ), operator( D1 )
+
+    # integral of tau^2 for the given twist at all nodes,
+    # with gradient = True also its derivative with respect to theta at all nodes
+    def torsion(self, theta: np.ndarray, gradient: bool = False ):
+        tau = self.tau_frenet + self.B1 @ theta[self._free_index]
+        val = self.constant_torsion + np.dot( self.wq, tau * tau )
+        if not gradient :
+            return val
+        return val, self._expand( 2.0 * ( self.B1.T @ ( self.wq * tau ) ) )
+
+    # integral of kappa_g^2 for the given twist at all nodes,
+    # with gradient = True also its derivative with respect to theta at all nodes
+    def geodesic_curvature(self, theta: np.ndarray, gradient: bool = False ):
+        theta_q = self.B0 @ theta[self._free_index]
+        kappa_g = np.sin( theta_q ) * self.kappa
+        val = np.dot( self.wq, kappa_g * kappa_g )
+        if not gradient :
+            return val
+        return val, self._expand( self.B0.T @ ( self.wq * self.kappa * self.kappa * np.sin( 2.0 * theta_q ) ) )
+
+    # scatter values at the free nodes into an array over all nodes
+    def _expand(self, values: np.ndarray ):
+        full = np.zeros( len(self.t) )
+        full[self._free_index] = values
+        return full
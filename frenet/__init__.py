@@ -1,6 +1,12 @@
 from frenet.AsciiFile import *
 from frenet.Basecurve import *
 from frenet.BasecurveCCT import *
+from frenet.BasecurveSpline import *
+from frenet.BasecurveSurrogate import *
 from frenet.CrossSection import *
+from frenet.CurveCache import *
 from frenet.Geometry import *
 from frenet.Point import *
+from frenet.PointTable import *
+from frenet.Snapshot import *
+from frenet.Topology import *
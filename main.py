@@ -9,16 +9,10 @@ import frenet
 # the basecurve
 C = frenet.BasecurveCCT( 60, 60, 0.25, 68, 4 )
 
-n = len(C.t)
-x = np.zeros( n )
-y = np.zeros( n )
-z = np.zeros( n )
-
-for k in range( n ) :
-    r = C.r( C.t[k])
-    x[k] = r[0]
-    y[k] = r[1]
-    z[k] = r[2]
+r = C.r_many( C.t )
+x = r[:,0]
+y = r[:,1]
+z = r[:,2]
 
 fig = plt.figure()
 
@@ -0,0 +1,40 @@
+import numpy as np
+
+import frenet
+
+# tapes at zero distance coincide, merging their points must not leave
+# zero-length or repeated curves in the .geo file
+def test_touching_tapes_merge( tmp_path ):
+    C = frenet.BasecurveCCT( 60, 60, 0.25, 68, 2 )
+    G = frenet.Geometry( C, frenet.CrossSection( 3, 4, 0.0 ), air_radius=20.0, tape_res=1.0, air_res=20.0 )
+    path = str( tmp_path / 'touching.geo' )
+    G.save( path )
+
+    # the parser fails on references to entities that were not written
+    T = frenet.AsciiFile().read_geo( path )
+
+    ids = T.points.ids
+    offsets = T.curves.offsets
+    curves = set()
+    for k, label in enumerate( T.curves.labels ):
+        p = tuple( ids[T.curves.children[offsets[k]:offsets[k+1]]].tolist() )
+        assert p[0] != p[-1]
+        assert p not in curves and p[::-1] not in curves
+        curves.add( p )
+
+    offsets = T.curveloops.offsets
+    for k in range( len(T.curveloops) ):
+        c = T.curveloops.children[offsets[k]:offsets[k+1]]
+        assert len( set( c.tolist() ) ) == len(c)
+
+    assert len(T.points) == len( np.unique( T.points.coords, axis=0 ) )
+
+# without coincident points nothing is merged
+def test_separate_tapes_keep_all_entities( tmp_path ):
+    C = frenet.BasecurveCCT( 60, 60, 0.25, 68, 2 )
+    G = frenet.Geometry( C, frenet.CrossSection( 3, 4, 1.0 ), air_radius=20.0, tape_res=1.0, air_res=20.0 )
+    path = str( tmp_path / 'separate.geo' )
+    G.save( path )
+
+    T = frenet.AsciiFile().read_geo( path )
+    assert T.sizes() == G.topology.sizes()